@@ -1,45 +1,203 @@
 import os
-import uuid
-import shutil
-import cv2
-from flask import Flask, request, jsonify, send_from_directory
+import base64
+import cProfile
+import json
+import multiprocessing
+import sys
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from flask import Flask, Response, g, request, jsonify, send_from_directory
 import numpy as np
 
-# Import custom modules for vision processing and solving
-from vision.grid_detection import warp_from_corners
-from vision.preprocessing import preprocess_image, split_cells
-from vision.grid_detection import find_sudoku_contour, get_perspective_transform
-from vision.OCR import recognize_cells
-from solver import solve_and_record_steps
+# Import custom modules for solving and session handling. The vision modules (OpenCV
+# pipeline, scipy, skimage and the OCR model) are imported by the routes that use them,
+# so workers serving only /solve and static files never load them.
+import solver as solver_module
+from metrics import registry, observe_search, update_memory_gauges
+from solver import (
+    iter_solve_steps, count_solutions, is_board_valid, solve_puzzle,
+    parse_puzzle, encode_steps, unpack_step, step_value_bits, board_size, SolveAborted, SOLVERS
+)
+from solve_cache import SolveCache, solve_with_cache
+from session_store import SessionStore, DiskSessionBackend, UploadTooLarge, decode_image, read_upload
+from image_cache import ImageResultCache, image_fingerprint
+from ocr_correction import correct_board, top_k_readings
+
+# Record node counts and search times of every solve in this process (solves in the
+# /solve_batch worker pool are not observed)
+solver_module.search_observer = observe_search
 
 # Flask app setup
 app = Flask(__name__)
 UPLOAD_FOLDER = 'sessions'
-MAX_IMAGE_SIZE_MB = 10
-
-# Utility: Session Handling 
-def get_session_path(session_id=None):
+SESSION_FILES = ('uploaded_image', 'warped_board')  # session images served under /sessions/
+MAX_IMAGE_SIZE_MB = float(os.environ.get("MAX_IMAGE_SIZE_MB", 10))
+MAX_IMAGE_BYTES = int(MAX_IMAGE_SIZE_MB * 1024 * 1024)
+# Requests announcing a larger body are refused before any of it is read (room for the form encoding)
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get("MAX_CONTENT_LENGTH", MAX_IMAGE_BYTES + 64 * 1024))
+MAX_VALIDATE_LIMIT = 100
+OCR_TOP_K = 3  # readings per cell returned by /ocr and tried by the correction search
+# Grid detection runs on a copy downscaled to about this size, corners are mapped back to full resolution
+DETECT_MAX_SIDE = int(os.environ.get("DETECT_MAX_SIDE", 1000))
+MIN_DETECT_SIDE = 100  # smallest 'maxSide' accepted by /detect_grid (0 still means full resolution)
+DETECT_REFINE = os.environ.get("DETECT_REFINE", "1") == "1"  # refine corners with cornerSubPix
+SOLVE_TIMEOUT_S = float(os.environ.get("SOLVE_TIMEOUT_S", 5))  # per grid, bounds worst-case search
+SOLVE_MAX_NODES = int(os.environ.get("SOLVE_MAX_NODES", 200000))
+# Solutions of equivalent puzzles are shared; set SOLVE_CACHE_DB to keep them across restarts.
+# SOLVE_CACHE_MB bounds the step logs held in memory.
+solve_cache = SolveCache(
+    max_entries=int(os.environ.get("SOLVE_CACHE_SIZE", 4096)),
+    db_path=os.environ.get("SOLVE_CACHE_DB"),
+    max_bytes=int(os.environ.get("SOLVE_CACHE_MB", 64)) * 1024 * 1024
+)
+MAX_BATCH_GRIDS = 20000
+BATCH_WORKERS = int(os.environ.get("SOLVER_WORKERS", os.cpu_count() or 1))
+_solver_pool = None  # lazily started, shared by all batch requests
+_solver_pool_lock = threading.Lock()
+# forkserver where the platform has it (not on Windows), otherwise spawn
+POOL_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+# PROFILE_REQUESTS=1 lets clients ask for a cProfile dump of a request (?profile=1 or X-Profile: 1)
+PROFILE_REQUESTS = os.environ.get("PROFILE_REQUESTS", "0") == "1"
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+
+def get_solver_pool():
+    global _solver_pool
+    with _solver_pool_lock:
+        if _solver_pool is None:
+            # Not fork: by now this process runs Flask, warm-up and micro-batcher threads, and a
+            # forked child could inherit one of their locks held. forkserver workers start clean.
+            _solver_pool = ProcessPoolExecutor(
+                max_workers=BATCH_WORKERS, mp_context=multiprocessing.get_context(POOL_START_METHOD)
+            )
+        return _solver_pool
+
+def discard_solver_pool(pool):
     """
-    Retrieve the file path for a session. 
-    If session_id is None, creates a new session folder and returns its id/path.
-    Raises if session_id is requested but doesn't exist.
+    Drops a pool that broke (a worker died, e.g. killed for memory), so the next
+    get_solver_pool() starts a fresh one. No-op if another request already replaced it.
     """
-    if session_id:
-        session_path = os.path.join(UPLOAD_FOLDER, session_id)
-        if not os.path.exists(session_path):
-            raise FileNotFoundError("Session not found")
-    else:
-        session_id = str(uuid.uuid4())
-        session_path = os.path.join(UPLOAD_FOLDER, session_id)
-        os.makedirs(session_path, exist_ok=True)
-    return session_id, session_path
+    global _solver_pool
+    with _solver_pool_lock:
+        if _solver_pool is pool:
+            _solver_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+# Startup phase run by create_app (OCR_WARMUP): 'background' (default) imports the vision
+# modules, loads the OCR model and runs dummy batches through it in a thread, GET /ready
+# answering 503 until it is done; 'sync' does it before the server starts listening;
+# 'off' leaves it all to the first vision request.
+OCR_WARMUP = os.environ.get("OCR_WARMUP", "background")
+OCR_WARMUP = {'0': 'off', '1': 'background'}.get(OCR_WARMUP, OCR_WARMUP)  # earlier 0/1 settings
+_warmup = {'mode': 'off', 'state': 'idle', 'ms': None, 'error': None}
+
+def warm_up_vision():
+    """
+    Imports the vision pipeline, loads the OCR model and traces it on 1- and 81-cell batches.
+    """
+    _warmup['state'] = 'running'
+    start = time.perf_counter()
+    try:
+        import vision.grid_detection  # noqa: F401 (imports OpenCV, scipy and skimage helpers)
+        from vision.OCR import warm_up
+        warm_up()
+    except Exception as e:
+        _warmup['error'] = str(e)
+        print(f"OCR warm-up failed: {e}")
+    _warmup['ms'] = round((time.perf_counter() - start) * 1000, 1)
+    _warmup['state'] = 'failed' if _warmup['error'] else 'ready'
+    if _warmup['state'] == 'ready':
+        print(f"Vision pipeline warmed up in {_warmup['ms']:.0f} ms")
+
+# Session images are kept decoded in memory between pipeline stages.
+# SESSION_BACKEND=disk also writes them through to UPLOAD_FOLDER, sharded by session ID.
+# Expired sessions and those over SESSION_DISK_MB are deleted every SESSION_SWEEP_S seconds
+# by a sweeper thread (0 disables it, e.g. when `python session_store.py` runs separately),
+# started by create_app() or, when the app object is served directly, by the first session.
+SESSION_TTL_S = float(os.environ.get("SESSION_TTL_S", 1800))
+SESSION_SWEEP_S = float(os.environ.get("SESSION_SWEEP_S", 60))
+session_backend = DiskSessionBackend(
+    UPLOAD_FOLDER, ttl_seconds=SESSION_TTL_S,
+    max_bytes=int(os.environ.get("SESSION_DISK_MB", 1024)) * 1024 * 1024,
+    sweep_interval=SESSION_SWEEP_S
+) if os.environ.get("SESSION_BACKEND", "memory") == "disk" else None
+session_store = SessionStore(
+    max_bytes=int(os.environ.get("SESSION_MEMORY_MB", 256)) * 1024 * 1024,
+    ttl_seconds=SESSION_TTL_S,
+    backend=session_backend,
+    rebuildable=('thresh', 'warped_board')  # see get_warped_board
+)
+
+# Detected corners of recent uploads, reused for identical or near-identical images, and OCR boards (exact images only)
+image_cache = ImageResultCache(
+    max_entries=int(os.environ.get("IMAGE_CACHE_SIZE", 256)),
+    max_distance=int(os.environ.get("IMAGE_CACHE_MAX_DISTANCE", 16))
+)
+
+def read_image_body(file=None):
+    """
+    Bytes of an uploaded image file, or of the raw request body, read in chunks into one
+    buffer (a memoryview, decoded in place by decode_image). Raises UploadTooLarge early.
+    """
+    if file is None:
+        return read_upload(request.stream, MAX_IMAGE_BYTES, request.content_length)
+    file.stream.seek(0, os.SEEK_END)
+    length = file.stream.tell()
+    file.stream.seek(0)
+    return read_upload(file.stream, MAX_IMAGE_BYTES, length)
+
+def get_fingerprint(session_id, image):
+    """
+    Image fingerprint of the session's upload, computed once and kept with the session.
+    """
+    fingerprint = session_store.get_meta(session_id, 'fingerprint')
+    if fingerprint is None:
+        fingerprint = image_fingerprint(image)
+        session_store.set_meta(session_id, 'fingerprint', fingerprint)
+    return fingerprint
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    g.profiler = None
+    if PROFILE_REQUESTS and (request.args.get('profile') == '1' or request.headers.get('X-Profile') == '1'):
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+@app.after_request
+def record_request(response):
+    """
+    Request latency and status counters per endpoint, and the profile dump if one was requested.
+    """
+    endpoint = request.endpoint or 'unknown'
+    start = g.get('request_start')
+    if start is not None:
+        registry.observe(
+            'sudoku_request_seconds', time.perf_counter() - start, endpoint=endpoint, method=request.method
+        )
+    registry.inc('sudoku_requests_total', endpoint=endpoint, status=response.status_code)
+
+    profiler = g.get('profiler')
+    if profiler is not None:
+        profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{endpoint}-{int(time.time() * 1000)}.prof")
+        profiler.dump_stats(path)
+        response.headers['X-Profile-File'] = path
+    return response
+
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({'error': 'Image too large'}), 413
 
 # Upload: POST /upload
 @app.route('/upload', methods=['POST'])
 def upload():
     """
-    Accepts an uploaded image, stores it, and returns a new session_id.
-    Limits image size, and keeps only the 10 newest sessions for disk cleanup.
+    Accepts an uploaded image, decodes it once, stores it in the session store and returns a new session_id.
+    Limits image size (MAX_IMAGE_SIZE_MB), reading no more of the body than that.
     """
     if 'image' not in request.files:
         return jsonify({'error': 'No file part'}), 400
@@ -48,22 +206,17 @@ def upload():
     if file.filename == '' or not file:
         return jsonify({'error': 'No selected file'}), 400
 
-    if len(file.read()) > MAX_IMAGE_SIZE_MB * 1024 * 1024:
-        return jsonify({'error': 'Image too large'}), 413
-    file.seek(0)
-
-    session_id, session_path = get_session_path()
-    image_path = os.path.join(session_path, 'uploaded_image.png')
-    file.save(image_path)
+    try:
+        data = read_image_body(file)
+        image = decode_image(data)
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-    # Limit total session folders to 10, delete oldest
-    session_folders = sorted(
-        [os.path.join(UPLOAD_FOLDER, d) for d in os.listdir(UPLOAD_FOLDER)],
-        key=os.path.getmtime
-    )
-    if len(session_folders) > 10:
-        for old_folder in session_folders[:-10]:
-            shutil.rmtree(old_folder)
+    session_id = session_store.create()
+    session_store.put(session_id, 'uploaded_image', image, encoded=data)
+    get_fingerprint(session_id, image)
 
     return jsonify({'session_id': session_id})
 
@@ -72,25 +225,59 @@ def upload():
 def detect_grid():
     """
     Given a session ID, finds the Sudoku grid, warps it, and returns a URL to the warped image + detected corners.
+    Detection runs on a downscaled copy (optional 'maxSide', default DETECT_MAX_SIDE, 0 for full resolution);
+    the warp samples the original image. Stage timings are returned in milliseconds.
+    Corners (and the OCR board, for /ocr) are reused from image_cache for an image seen before.
     """
+    from vision.grid_detection import find_grid_corners, get_perspective_transform
+
     session_id = request.form.get('session_id')
     if not session_id:
         return jsonify({'error': 'Missing session_id'}), 400
 
     try:
-        session_id, session_path = get_session_path(session_id)
-        image_path = os.path.join(session_path, 'uploaded_image.png')
-
-        original, thresh = preprocess_image(image_path)
-        contour = find_sudoku_contour(thresh)
-        warped, ordered_corners = get_perspective_transform(original, contour)
+        max_side = int(request.form.get('maxSide', DETECT_MAX_SIDE))
+    except ValueError:
+        return jsonify({'error': 'maxSide must be an integer'}), 400
+    if max_side != 0 and max_side < MIN_DETECT_SIDE:
+        return jsonify({'error': f'maxSide must be 0 or at least {MIN_DETECT_SIDE}'}), 400
 
-        warped_path = os.path.join(session_path, 'warped_board.png')
-        cv2.imwrite(warped_path, warped)
+    try:
+        original = session_store.get(session_id, 'uploaded_image')
+        if original is None:
+            raise FileNotFoundError("No uploaded image")
+
+        start = time.perf_counter()
+        fingerprint = get_fingerprint(session_id, original)
+        cached = image_cache.get(fingerprint)
+        timings = {'fingerprint': round((time.perf_counter() - start) * 1000, 2)}
+
+        if cached is not None:
+            corners = np.array(cached['corners'], dtype="float32")
+        else:
+            cached_thresh = session_store.get(session_id, 'thresh')
+            corners, thresh, detect_timings = find_grid_corners(
+                original, max_side=max_side, refine=DETECT_REFINE, thresh=cached_thresh
+            )
+            timings.update(detect_timings)
+            if thresh is not cached_thresh:
+                session_store.put(session_id, 'thresh', thresh)
+
+        start = time.perf_counter()
+        warped, ordered_corners = get_perspective_transform(original, corners)
+        timings['warp'] = round((time.perf_counter() - start) * 1000, 2)
+
+        session_store.put(session_id, 'warped_board', warped)
+        session_store.set_meta(session_id, 'corners', ordered_corners.tolist())
+        session_store.set_meta(session_id, 'ocr_board', cached['board'] if cached else None)
+        if cached is None:
+            image_cache.put(fingerprint, ordered_corners)
 
         return jsonify({
             'warped_url': f'/sessions/{session_id}/warped_board.png',
-            'corners': ordered_corners.tolist()
+            'corners': ordered_corners.tolist(),
+            'cached': cached is not None,
+            'timings': timings
         })
     except Exception as e:
         return jsonify({'error': f'Detection failed: {str(e)}'}), 500
@@ -101,6 +288,8 @@ def manual_warp():
     """
     Warps the image according to user-provided corner points (from manual corner selection).
     """
+    from vision.grid_detection import warp_from_corners
+
     session_id = request.form.get('session_id')
     corners = request.form.get('corners')
 
@@ -113,13 +302,17 @@ def manual_warp():
         if corners.shape != (4, 2):
             raise ValueError("Corners must be a 4x2 array")
 
-        session_id, session_path = get_session_path(session_id)
-        image_path = os.path.join(session_path, 'uploaded_image.png')
-        original = cv2.imread(image_path)
+        original = session_store.get(session_id, 'uploaded_image')
+        if original is None:
+            raise FileNotFoundError("No uploaded image")
 
         warped = warp_from_corners(original, corners)
-        warped_path = os.path.join(session_path, 'warped_board.png')
-        cv2.imwrite(warped_path, warped)
+        session_store.put(session_id, 'warped_board', warped)
+
+        # Remember the user's corners for re-uploads of this image; its OCR board is redone
+        session_store.set_meta(session_id, 'corners', corners.tolist())
+        session_store.set_meta(session_id, 'ocr_board', None)
+        image_cache.put(get_fingerprint(session_id, original), corners)
 
         return jsonify({
             'warped_url': f'/sessions/{session_id}/warped_board.png',
@@ -128,62 +321,419 @@ def manual_warp():
     except Exception as e:
         return jsonify({'error': f'Manual warp failed: {str(e)}'}), 500
 
+def get_warped_board(session_id):
+    """
+    The session's warped board, rewarped from the uploaded image and its corners if the
+    memory-only session store dropped it to stay within budget. None before any warp.
+    """
+    warped = session_store.get(session_id, 'warped_board')
+    corners = session_store.get_meta(session_id, 'corners')
+    if warped is None and corners is not None:
+        from vision.grid_detection import warp_from_corners
+
+        original = session_store.get(session_id, 'uploaded_image')
+        if original is not None:
+            warped = warp_from_corners(original, corners)
+            session_store.put(session_id, 'warped_board', warped)
+    return warped
+
 # OCR: POST /ocr
 @app.route('/ocr', methods=['POST'])
 def ocr_grid():
     """
     Runs OCR on the warped Sudoku image for the session, returns the recognized board as a 2D list.
+    If the argmax reading is not uniquely solvable, 'input' is the most probable alternative reading
+    that is (see ocr_correction.py); 'ocrBoard', 'corrections' and per-cell top-k 'candidates' are included.
+    The board is taken from image_cache when /detect_grid found this image (with the same corners) there.
     """
+    from vision.OCR import recognize_board
+
     session_id = request.form.get('session_id')
     if not session_id:
         return jsonify({'error': 'Missing session_id'}), 400
 
     try:
-        session_id, session_path = get_session_path(session_id)
-        warped_path = os.path.join(session_path, 'warped_board.png')
-        warped = cv2.imread(warped_path)
-
-        cell_imgs = split_cells(warped)
-        board = recognize_cells(cell_imgs)
+        cached_board = session_store.get_meta(session_id, 'ocr_board')
+        if cached_board is not None:
+            return jsonify({'input': cached_board, 'cached': True})
+
+        warped = get_warped_board(session_id)
+        if warped is None:
+            raise FileNotFoundError("No warped board, run grid detection first")
+
+        ocr_board, probs = recognize_board(warped, return_probs=True)
+        correction = correct_board(
+            ocr_board, probs, top_k=OCR_TOP_K, timeout=SOLVE_TIMEOUT_S, max_nodes=SOLVE_MAX_NODES
+        )
+        board = correction['board']
+
+        fingerprint = session_store.get_meta(session_id, 'fingerprint')
+        corners = session_store.get_meta(session_id, 'corners')
+        if fingerprint is not None and corners is not None:
+            image_cache.put(fingerprint, corners, board)
+            session_store.set_meta(session_id, 'ocr_board', board)
 
-        return jsonify({'input': board})
+        return jsonify({
+            'input': board,
+            'ocrBoard': ocr_board,
+            'unique': correction['unique'],
+            'corrections': correction['changes'],
+            'candidates': top_k_readings(probs, OCR_TOP_K),
+            'cached': False
+        })
 
     except Exception as e:
         return jsonify({'error': f'OCR failed: {str(e)}'}), 500
 
+# Scan: POST /scan
+@app.route('/scan', methods=['POST'])
+def scan():
+    """
+    Runs the whole pipeline (decode, grid detection, warp, OCR, solve) in memory in one call.
+    The image is sent as the 'image' file field or as the raw request body.
+    Optional 'solver' picks the engine, and 'session' (true/1) also stores the images in a
+    new session so the /sessions/ URLs and /manual_warp can be used afterwards.
+    Returns the recognized board, corners, solution and per-stage timings in milliseconds.
+    Detection and OCR are skipped for images found in image_cache. Misreads that leave the board
+    without a unique solution are corrected as in /ocr ('ocrBoard' and 'corrections').
+    """
+    from vision.grid_detection import find_grid_corners, get_perspective_transform
+    from vision.OCR import recognize_board
+
+    try:
+        data = read_image_body(request.files.get('image'))
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    if not data:
+        return jsonify({'error': 'No image data'}), 400
+
+    solver_name = request.values.get('solver', 'backtrack')
+    if solver_name not in SOLVERS:
+        return jsonify({'error': f'Unknown solver: {solver_name}'}), 400
+    keep_session = request.values.get('session', '').lower() in ('1', 'true', 'yes')
+
+    timings = {}
+    start = stage_start = time.perf_counter()
+
+    def lap(stage):
+        nonlocal stage_start
+        now = time.perf_counter()
+        timings[stage] = round((now - stage_start) * 1000, 2)
+        stage_start = now
+
+    try:
+        image = decode_image(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    lap('decode')
+
+    fingerprint = image_fingerprint(image)
+    cached = image_cache.get(fingerprint)
+    lap('fingerprint')
+
+    thresh = warped = correction = None
+    board = cached['board'] if cached else None
+    try:
+        if cached is not None:
+            corners = np.array(cached['corners'], dtype="float32")
+        else:
+            corners, thresh, detect_timings = find_grid_corners(image, max_side=DETECT_MAX_SIDE, refine=DETECT_REFINE)
+            timings.update(detect_timings)
+            stage_start = time.perf_counter()
+        if board is None or keep_session:
+            warped, ordered_corners = get_perspective_transform(image, corners)
+            lap('warp')
+        else:
+            ordered_corners = corners
+    except Exception as e:
+        return jsonify({'error': f'Detection failed: {str(e)}', 'timings': timings}), 422
+
+    if board is None:
+        try:
+            ocr_board, probs = recognize_board(warped, return_probs=True)
+            lap('ocr')
+            correction = correct_board(
+                ocr_board, probs, top_k=OCR_TOP_K, timeout=SOLVE_TIMEOUT_S, max_nodes=SOLVE_MAX_NODES
+            )
+            board = correction['board']
+            lap('correction')
+        except Exception as e:
+            return jsonify({'error': f'OCR failed: {str(e)}', 'timings': timings}), 500
+        image_cache.put(fingerprint, ordered_corners, board)
+
+    result = {
+        'board': board, 'corners': ordered_corners.tolist(),
+        'cached': cached is not None, 'success': False, 'solution': None
+    }
+    if correction is not None:
+        result['ocrBoard'] = ocr_board
+        result['corrections'] = correction['changes']
+    try:
+        if is_board_valid(board):
+            success, steps, solution = solve_with_cache(
+                [row[:] for row in board], solve_cache, solver=solver_name,
+                timeout=SOLVE_TIMEOUT_S, max_nodes=SOLVE_MAX_NODES
+            )
+            if isinstance(success, SolveAborted):
+                result['aborted'] = success.to_dict()
+            elif success:
+                result.update(success=True, solution=solution, stepCount=len(steps))
+        lap('solve')
+    except Exception as e:
+        return jsonify({'error': f'Solving failed: {str(e)}', 'timings': timings}), 500
+
+    if keep_session:
+        session_id = session_store.create()
+        session_store.put(session_id, 'uploaded_image', image, encoded=data)
+        if thresh is not None:
+            session_store.put(session_id, 'thresh', thresh)
+        session_store.put(session_id, 'warped_board', warped)
+        session_store.set_meta(session_id, 'fingerprint', fingerprint)
+        session_store.set_meta(session_id, 'corners', ordered_corners.tolist())
+        session_store.set_meta(session_id, 'ocr_board', board)
+        result['session_id'] = session_id
+        result['warped_url'] = f'/sessions/{session_id}/warped_board.png'
+
+    timings['total'] = round((time.perf_counter() - start) * 1000, 2)
+    result['timings'] = timings
+    return jsonify(result)
+
 # Solve: POST /solve
 @app.route('/solve', methods=['POST'])
 def solve():
     """
     Solves the provided Sudoku grid, returns success flag, all steps, and final solved board.
+    The grid may be 4x4, 9x9, 16x16 or 25x25 ('size' in the response).
+    An optional 'solver' field picks the engine ('backtrack' or 'dlx').
+    Steps are sent packed (base64 of little-endian uint16, cell << stepValueBits | value, the
+    value taking 4 bits up to 9x9 and 5 above) unless 'stepFormat' is 'list', which returns
+    the legacy list of {'row', 'col', 'value'} dicts.
+    9x9 results are cached by the puzzle's canonical form, see solve_cache.py.
     """
     data = request.get_json()
     if not data or 'grid' not in data:
         return jsonify({'error': 'Missing grid data'}), 400
 
+    solver_name = data.get('solver', 'backtrack')
+    if solver_name not in SOLVERS:
+        return jsonify({'error': f'Unknown solver: {solver_name}'}), 400
+
+    step_format = data.get('stepFormat', 'packed')
+    if step_format not in ('packed', 'list'):
+        return jsonify({'error': f'Unknown stepFormat: {step_format}'}), 400
+
+    try:
+        size = board_size(data['grid'])
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid grid: {str(e)}'}), 400
+
     try:
         board = data['grid']
         board_copy = [row[:] for row in board]  # Deep copy to preserve input
-        success, steps, final_board = solve_and_record_steps(board_copy)
+        success, steps, final_board = solve_with_cache(
+            board_copy, solve_cache, solver=solver_name,
+            timeout=SOLVE_TIMEOUT_S, max_nodes=SOLVE_MAX_NODES
+        )
+        if isinstance(success, SolveAborted):
+            return jsonify({'error': 'Solve aborted: search budget exceeded', 'aborted': success.to_dict()}), 422
+
+        if step_format == 'packed':
+            encoded_steps = base64.b64encode(encode_steps(steps)).decode('ascii')
+        else:
+            encoded_steps = [dict(zip(('row', 'col', 'value'), unpack_step(code, size))) for code in steps]
 
         return jsonify({
             'success': success,
-            'steps': steps,
+            'size': size,
+            'stepFormat': step_format,
+            'stepValueBits': step_value_bits(size),
+            'stepCount': len(steps),
+            'steps': encoded_steps,
             'finalBoard': final_board
         })
     except Exception as e:
         return jsonify({'error': f'Solving failed: {str(e)}'}), 500
 
+# Streaming Solve: GET /solve_stream
+@app.route('/solve_stream', methods=['GET'])
+def solve_stream():
+    """
+    Streams solver steps as Server-Sent Events while the search runs.
+    Query params: 'grid' as an 81-character string, optional 'solver'.
+    Sends 'steps' events (base64 packed steps, same encoding as /solve) and a final 'done' event.
+    The search only advances while the client reads, so a disconnect stops it.
+    """
+    solver_name = request.args.get('solver', 'backtrack')
+    if solver_name not in SOLVERS:
+        return jsonify({'error': f'Unknown solver: {solver_name}'}), 400
+
+    try:
+        board = parse_puzzle(request.args.get('grid', ''))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid grid: {str(e)}'}), 400
+
+    def sse(event, data):
+        return f'event: {event}\ndata: {data}\n\n'
+
+    def generate():
+        steps = iter_solve_steps(board, solver=solver_name, timeout=SOLVE_TIMEOUT_S, max_nodes=SOLVE_MAX_NODES)
+        try:
+            while True:
+                batch = next(steps)
+                yield sse('steps', base64.b64encode(encode_steps(batch)).decode('ascii'))
+        except StopIteration as stop:
+            done = {'success': bool(stop.value), 'finalBoard': board}
+            if isinstance(stop.value, SolveAborted):
+                done['aborted'] = stop.value.to_dict()
+            yield sse('done', json.dumps(done))
+        finally:
+            steps.close()  # client went away: abandon the search
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+# Batch Solve: POST /solve_batch
+@app.route('/solve_batch', methods=['POST'])
+def solve_batch():
+    """
+    Solves many grids in parallel on the solver process pool, results are returned in input order.
+    Accepts a JSON array of grids (81-char strings or 9x9 lists), a JSON object {'grids': [...], 'solver': ...},
+    or a plain-text body with one 81-character puzzle per line.
+    """
+    solver_name = 'backtrack'
+    if request.is_json:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            solver_name = data.get('solver', solver_name)
+            data = data.get('grids')
+        grids = data
+    else:
+        text = request.get_data(as_text=True)
+        grids = [line.strip() for line in text.splitlines() if line.strip()]
+
+    if not isinstance(grids, list) or not grids:
+        return jsonify({'error': 'Missing grid data'}), 400
+    if len(grids) > MAX_BATCH_GRIDS:
+        return jsonify({'error': f'Too many grids (max {MAX_BATCH_GRIDS})'}), 413
+    if solver_name not in SOLVERS:
+        return jsonify({'error': f'Unknown solver: {solver_name}'}), 400
+
+    try:
+        # A few chunks per worker keeps IPC overhead low while still balancing uneven puzzles
+        chunksize = max(1, len(grids) // (BATCH_WORKERS * 4))
+        solve = partial(solve_puzzle, solver=solver_name, timeout=SOLVE_TIMEOUT_S, max_nodes=SOLVE_MAX_NODES)
+        for _ in range(2):  # a broken pool is replaced and the batch retried once
+            pool = get_solver_pool()
+            try:
+                results = list(pool.map(solve, grids, chunksize=chunksize))
+                break
+            except BrokenProcessPool:
+                discard_solver_pool(pool)
+        else:
+            return jsonify({'error': 'Batch solving failed: solver workers died, try again'}), 503
+
+        return jsonify({
+            'count': len(results),
+            'solved': sum(1 for r in results if r['success']),
+            'results': results
+        })
+    except Exception as e:
+        return jsonify({'error': f'Batch solving failed: {str(e)}'}), 500
+
+# Validate: POST /validate
+@app.route('/validate', methods=['POST'])
+def validate():
+    """
+    Checks whether the provided grid has zero, one or several solutions without recording steps.
+    Counting stops at 'limit' (default 2), which is enough to tell unique from ambiguous, and
+    shares the /solve time and node budget; running out of it returns 422.
+    """
+    data = request.get_json()
+    if not data or 'grid' not in data:
+        return jsonify({'error': 'Missing grid data'}), 400
+
+    try:
+        board_size(data['grid'])
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid grid: {str(e)}'}), 400
+
+    try:
+        limit = int(data.get('limit', 2))
+        if not 1 <= limit <= MAX_VALIDATE_LIMIT:
+            return jsonify({'error': f'limit must be between 1 and {MAX_VALIDATE_LIMIT}'}), 400
+
+        board = data['grid']
+        valid = is_board_valid(board)
+        solutions = count_solutions(
+            board, limit=limit, timeout=SOLVE_TIMEOUT_S, max_nodes=SOLVE_MAX_NODES
+        ) if valid else 0
+        if isinstance(solutions, SolveAborted):
+            return jsonify({
+                'error': 'Validation aborted: search budget exceeded',
+                'aborted': solutions.to_dict()
+            }), 422
+
+        return jsonify({
+            'valid': valid,
+            'solutions': solutions,
+            'unique': solutions == 1 and limit > 1,
+            'limitReached': solutions >= limit
+        })
+    except Exception as e:
+        return jsonify({'error': f'Validation failed: {str(e)}'}), 500
+
+# Stats: GET /stats
+@app.route('/stats', methods=['GET'])
+def stats():
+    """
+    Hit/miss counters and sizes of the server-side caches and the session store.
+    """
+    ocr = sys.modules.get('vision.OCR')  # not imported yet on workers that have not run OCR
+    return jsonify({
+        'imageCache': image_cache.stats(),
+        'ocrBatcher': ocr.batcher_stats() if ocr is not None else None,
+        'solveCache': solve_cache.stats(),
+        'sessions': session_store.stats()
+    })
+
+# Readiness: GET /ready
+@app.route('/ready', methods=['GET'])
+def ready():
+    """
+    503 while the startup warm-up is running, 200 otherwise (also when it failed: the
+    solver routes still work, vision requests then report the error themselves).
+    """
+    status = 503 if _warmup['state'] == 'running' else 200
+    return jsonify({'ready': status == 200, 'warmup': _warmup}), status
+
+# Metrics: GET /metrics
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Stage latencies, solver node counts, request latencies and memory in the Prometheus text format.
+    """
+    update_memory_gauges()
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
 # Serve session files (images etc.)
 @app.route('/sessions/<session_id>/<path:filename>')
 def serve_session_file(session_id, filename):
     """
-    Serves session-specific files (like warped images) from disk.
+    Serves session images (like the warped board) as PNG, encoded only when requested.
+    Only the images in SESSION_FILES are served.
     """
-    session_path = os.path.join(UPLOAD_FOLDER, session_id)
-    if not os.path.exists(os.path.join(session_path, filename)):
+    name, ext = os.path.splitext(filename)
+    try:
+        png = session_store.get_png(session_id, name) if ext == '.png' and name in SESSION_FILES else None
+        if png is None and ext == '.png' and name == 'warped_board' and get_warped_board(session_id) is not None:
+            png = session_store.get_png(session_id, name)
+    except FileNotFoundError:
+        png = None
+    if png is None:
         return jsonify({'error': 'File not found'}), 404
-    return send_from_directory(session_path, filename)
+    return Response(png, mimetype='image/png', headers={'Cache-Control': 'no-cache'})
 
 # Serve static files for frontend (index, js, css, etc.)
 @app.route('/')
@@ -194,9 +744,29 @@ def serve_index():
 def serve_static(path):
     return send_from_directory('docs', path)
 
+def create_app(warmup=None):
+    """
+    Runs the startup phase and returns the app; for WSGI servers use `app:create_app()`.
+    warmup is 'background', 'sync' or 'off' (default OCR_WARMUP, see above).
+    Importing this module alone loads neither the vision modules nor the model, and the
+    session sweeper only starts here or with the first session.
+    """
+    mode = warmup or OCR_WARMUP
+    if mode not in ('background', 'sync', 'off'):
+        raise ValueError(f"Unknown warm-up mode: {mode}")
+    if session_backend is not None and SESSION_SWEEP_S > 0:
+        session_backend.start_sweeper(SESSION_SWEEP_S)
+    if _warmup['mode'] == 'off' and mode != 'off':
+        _warmup['mode'] = mode
+        if mode == 'sync':
+            warm_up_vision()
+        else:
+            _warmup['state'] = 'running'  # so /ready answers 503 before the thread gets going
+            threading.Thread(target=warm_up_vision, name='vision-warmup', daemon=True).start()
+    return app
+
 # Main entrypoint
 if __name__ == '__main__':
-    # Ensure upload directory exists, run Flask app
-    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    # Run Flask app
     port = int(os.environ.get("PORT", 5000))
-    app.run(host="0.0.0.0", port=port, debug=False)
+    create_app().run(host="0.0.0.0", port=port, debug=False)
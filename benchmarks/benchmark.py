@@ -0,0 +1,395 @@
+import argparse
+import glob
+import io
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+# Add project root to sys.path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+from vision.preprocessing import preprocess_image, split_cells, find_cell_bounds, center_digit
+from vision.grid_detection import (
+    downscale_for_detection, find_sudoku_contour, refine_corners, get_perspective_transform, DETECT_MAX_SIDE
+)
+from vision.OCR import find_digit_cells, forward
+import solver
+from solver import parse_puzzle, is_board_valid, solve_sudoku, SOLVERS, SolveAborted
+
+# Headless benchmarks for the vision pipeline (per stage, over test/Images), the
+# solvers (over benchmarks/puzzles.csv, and generated 4x4 to 25x25 puzzles), worker cold
+# start (startup_probe.py) and the peak memory of an upload. Results are written as JSON; --compare prints
+# the change against an earlier result file so regressions show up between commits.
+#
+#   python benchmarks/benchmark.py --out bench.json
+#   python benchmarks/benchmark.py --suite solver --compare bench.json
+
+IMAGES = os.path.join(ROOT, 'test', 'Images', '*.jpg')
+CORPUS = os.path.join(ROOT, 'benchmarks', 'puzzles.csv')
+STARTUP_PROBE = os.path.join(ROOT, 'benchmarks', 'startup_probe.py')
+REGRESSION_THRESHOLD = 0.10  # --compare flags metrics that got this much slower
+# Generated puzzles per board size and their share of blank cells. Randomly blanked 25x25
+# grids get very hard for both engines from about 55% blanks on.
+SIZE_BLANKS = {4: 0.6, 9: 0.6, 16: 0.55, 25: 0.5}
+SIZE_PUZZLES = 5
+SIZE_TIMEOUT_S = 30
+
+
+def timed(fn, repeats):
+    """
+    Runs fn `repeats` times, returns (last result, median milliseconds).
+    """
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return result, float(np.median(timings))
+
+
+def bench_image(path, repeats):
+    """
+    Median time of each pipeline stage on one image. Stages after a failure are skipped.
+    """
+    stages = {}
+    image, stages['decode'] = timed(lambda: cv2.imread(path), repeats)
+
+    def preprocess():
+        small, scale = downscale_for_detection(image, DETECT_MAX_SIDE)
+        return scale, preprocess_image(small)[1]
+
+    (scale, thresh), stages['preprocess'] = timed(preprocess, repeats)
+
+    def contour():
+        corners = find_sudoku_contour(thresh).reshape(4, 2).astype("float32") / scale
+        return refine_corners(image, corners, win=max(2, int(np.ceil(1.0 / scale)))) if scale < 1.0 else corners
+
+    try:
+        corners, stages['contour'] = timed(contour, repeats)
+    except ValueError as e:
+        return {'stages': stages, 'error': str(e)}
+
+    (warped, _), stages['warp'] = timed(lambda: get_perspective_transform(image, corners), repeats)
+    _, stages['split'] = timed(lambda: split_cells(warped), repeats)
+    _, stages['split_lines'] = timed(lambda: find_cell_bounds(warped), repeats)
+    (has_digit, cleaned, (row_spans, col_spans)), stages['blank_detection'] = timed(
+        lambda: find_digit_cells(warped), repeats
+    )
+
+    def tensors():
+        cells = [
+            center_digit(cleaned[row_spans[r][0]:row_spans[r][1], col_spans[c][0]:col_spans[c][1]])
+            for r in range(9) for c in range(9) if has_digit[r, c]
+        ]
+        return np.concatenate(cells) if cells else np.zeros((0, 28, 28, 1), np.float32)
+
+    batch, stages['centering'] = timed(tensors, repeats)
+    result = {'stages': stages, 'warped': list(warped.shape[:2]), 'digits': int(has_digit.sum())}
+    try:
+        forward(batch)  # load / trace the model outside the timing
+        _, stages['inference'] = timed(lambda: forward(batch), repeats)
+    except Exception as e:
+        result['inference_error'] = str(e)
+    stages['total'] = sum(stages.values())
+    return result
+
+
+def bench_vision(repeats):
+    images = {}
+    for path in sorted(glob.glob(IMAGES)):
+        images[os.path.basename(path)] = bench_image(path, repeats)
+        print(f"{os.path.basename(path)}: " + ", ".join(
+            f"{stage} {ms:.1f}" for stage, ms in images[os.path.basename(path)]['stages'].items()
+        ) + " ms")
+
+    # Median per stage over the images where it ran
+    stage_names = {stage for result in images.values() for stage in result['stages']}
+    summary = {
+        stage: float(np.median([r['stages'][stage] for r in images.values() if stage in r['stages']]))
+        for stage in sorted(stage_names)
+    }
+    return {'images': images, 'median_ms': summary}
+
+
+def load_corpus(path=CORPUS):
+    puzzles = []
+    with open(path) as f:
+        for line in f:
+            if line.strip() and not line.startswith('#'):
+                tier, puzzle, name = line.strip().split(',')
+                puzzles.append((tier, puzzle, name))
+    return puzzles
+
+
+def timed_solve(solver_name, board, timeout=None):
+    """
+    Solves a copy of the board with solve_sudoku. Returns (result, ms, search nodes), the
+    node count as reported to solver.search_observer.
+    """
+    seen = []
+    solver.search_observer = lambda name, outcome, nodes, elapsed_ms, steps: seen.append(nodes)
+    board = [row[:] for row in board]
+    try:
+        start = time.perf_counter()
+        result = solve_sudoku(board, solver=solver_name, timeout=timeout)
+        ms = (time.perf_counter() - start) * 1000
+    finally:
+        solver.search_observer = None
+    return result, ms, seen[-1] if seen else 0
+
+
+def percentiles(values):
+    result = {f'p{q}': float(np.percentile(values, q)) for q in (50, 90, 99)}
+    result['max'] = float(max(values))
+    return result
+
+
+def bench_solver(repeats):
+    puzzles = load_corpus()
+    results = {}
+    for solver_name in SOLVERS:
+        tiers = {}
+        for tier, puzzle, name in puzzles:
+            nodes = 0
+            timings = []
+            board = parse_puzzle(puzzle)
+            for _ in range(repeats):
+                solved, ms, nodes = timed_solve(solver_name, board)
+                timings.append(ms)
+                if solved is not True:
+                    raise AssertionError(f"{solver_name} failed to solve {name}")
+            tiers.setdefault(tier, []).append({'name': name, 'ms': float(np.median(timings)), 'nodes': nodes})
+
+        summary = {}
+        for tier, runs in tiers.items():
+            ms = [run['ms'] for run in runs]
+            nodes = sum(run['nodes'] for run in runs)
+            summary[tier] = {
+                'puzzles': len(runs),
+                'ms': percentiles(ms),
+                'nodes': nodes,
+                'nodes_per_sec': nodes / (sum(ms) / 1000) if sum(ms) else 0.0,
+                'puzzles_per_sec': len(runs) / (sum(ms) / 1000) if sum(ms) else 0.0
+            }
+            print(f"{solver_name:9} {tier:8} p50 {summary[tier]['ms']['p50']:7.2f} ms  "
+                  f"p99 {summary[tier]['ms']['p99']:7.2f} ms  {summary[tier]['nodes_per_sec']:10.0f} nodes/s")
+        results[solver_name] = {'tiers': summary, 'puzzles': tiers}
+    return results
+
+
+def bench_startup(repeats):
+    """
+    Cold start of a solver-only worker (no warm-up) and a full worker (blocking warm-up),
+    each in fresh interpreters: median ms to import app, to be ready and to answer the first
+    request, plus the whole process lifetime.
+    """
+    results = {}
+    for role in ('solver', 'full'):
+        runs = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            output = subprocess.run(
+                [sys.executable, STARTUP_PROBE, role], capture_output=True, text=True, check=True
+            ).stdout
+            run = json.loads(output.strip().splitlines()[-1])
+            run['timings']['process'] = (time.perf_counter() - start) * 1000
+            runs.append(run)
+        last = runs[-1]
+        results[role] = {
+            'median_ms': {key: float(np.median([run['timings'][key] for run in runs])) for key in last['timings']},
+            'status': last['status'],
+            'warmup': last['warmup'],
+            'visionLoaded': last['visionLoaded'],
+            'tensorflowLoaded': last['tensorflowLoaded']
+        }
+        print(f"{role:6} worker: " + ", ".join(
+            f"{key} {ms:.0f}" for key, ms in results[role]['median_ms'].items()
+        ) + f" ms (first response {last['status']}, vision loaded: {last['visionLoaded']})")
+    return results
+
+
+def bench_upload(repeats):
+    """
+    Peak traced memory (MB) of a POST /upload of a 12 MP photo, from reading the body to the
+    response, measured on the WSGI app directly so the request body built beforehand is not
+    counted.
+    """
+    from werkzeug.test import EnvironBuilder
+    os.environ.setdefault('OCR_WARMUP', 'off')
+    import app
+
+    image = cv2.resize(cv2.imread(sorted(glob.glob(IMAGES))[0]), (4000, 3000), interpolation=cv2.INTER_CUBIC)
+    image = cv2.add(image, np.random.default_rng(0).integers(0, 24, image.shape, dtype=np.uint8))  # film grain
+    data = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 100])[1].tobytes()
+
+    peaks = []
+    for _ in range(repeats):
+        environ = EnvironBuilder(
+            path='/upload', method='POST', data={'image': (io.BytesIO(data), 'upload.jpg')}
+        ).get_environ()
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        b''.join(app.app.wsgi_app(environ, lambda status, headers, exc_info=None: None))
+        peaks.append((tracemalloc.get_traced_memory()[1] - base) / 1e6)
+        tracemalloc.stop()
+    result = {'body_mb': len(data) / 1e6, 'decoded_mb': image.nbytes / 1e6, 'peak_mb': float(np.median(peaks))}
+    print(f"upload: {result['body_mb']:.1f} MB body, {result['decoded_mb']:.1f} MB decoded, "
+          f"peak {result['peak_mb']:.1f} MB")
+    return result
+
+
+def generate_puzzle(size, blanks, rng):
+    """
+    A size x size puzzle: a pattern solution shuffled by band, stack, row, column and digit
+    permutations (and maybe transposed), with a `blanks` share of cells cleared at random.
+    It is solvable but not necessarily uniquely.
+    """
+    box = math.isqrt(size)
+
+    def line_order():
+        return [band * box + i for band in rng.sample(range(box), box) for i in rng.sample(range(box), box)]
+
+    rows, cols, digits = line_order(), line_order(), rng.sample(range(1, size + 1), size)
+    board = [[digits[(box * (r % box) + r // box + c) % size] for c in cols] for r in rows]
+    if rng.random() < 0.5:
+        board = [list(col) for col in zip(*board)]
+    for cell in rng.sample(range(size * size), round(blanks * size * size)):
+        board[cell // size][cell % size] = 0
+    return board
+
+
+def bench_sizes(repeats):
+    """
+    How the engines scale with the board size, over SIZE_PUZZLES generated puzzles per size
+    (fixed seeds, so runs compare). Searches are capped at SIZE_TIMEOUT_S.
+    """
+    results = {}
+    for solver_name in SOLVERS:
+        sizes = {}
+        for size, blanks in SIZE_BLANKS.items():
+            ms, nodes, aborted = [], 0, 0
+            for seed in range(SIZE_PUZZLES):
+                board = generate_puzzle(size, blanks, random.Random(seed))
+                assert is_board_valid(board)
+                timings = []
+                for _ in range(repeats):
+                    solved, run_ms, run_nodes = timed_solve(solver_name, board, timeout=SIZE_TIMEOUT_S)
+                    timings.append(run_ms)
+                    if solved is False:
+                        raise AssertionError(f"{solver_name} found no solution for a generated {size}x{size} puzzle")
+                ms.append(float(np.median(timings)))
+                nodes += run_nodes
+                aborted += isinstance(solved, SolveAborted)
+            sizes[str(size)] = {
+                'puzzles': SIZE_PUZZLES,
+                'blanks': blanks,
+                'ms': percentiles(ms),
+                'nodes': nodes,
+                'nodes_per_sec': nodes / (sum(ms) / 1000) if sum(ms) else 0.0,
+                'aborted': aborted
+            }
+            print(f"{solver_name:9} {size:2}x{size:<2}  p50 {sizes[str(size)]['ms']['p50']:9.2f} ms  "
+                  f"max {sizes[str(size)]['ms']['max']:9.2f} ms  {sizes[str(size)]['nodes_per_sec']:10.0f} nodes/s"
+                  + (f"  ({aborted} aborted)" if aborted else ""))
+        results[solver_name] = sizes
+    return results
+
+
+def metadata():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__
+    }
+
+
+def flatten(results):
+    """
+    Timing metrics of a result file as {'vision.warp': ms, 'solver.dlx.hard.p50': ms, ...}.
+    """
+    metrics = {}
+    if 'vision' in results:
+        for stage, ms in results['vision']['median_ms'].items():
+            metrics[f'vision.{stage}'] = ms
+    if 'solver' in results:
+        for solver_name, result in results['solver'].items():
+            for tier, summary in result['tiers'].items():
+                for q in ('p50', 'p99'):
+                    metrics[f'solver.{solver_name}.{tier}.{q}'] = summary['ms'][q]
+    if 'sizes' in results:
+        for solver_name, sizes in results['sizes'].items():
+            for size, summary in sizes.items():
+                metrics[f'sizes.{solver_name}.{size}x{size}.p50'] = summary['ms']['p50']
+    if 'startup' in results:
+        for role, result in results['startup'].items():
+            for key, ms in result['median_ms'].items():
+                metrics[f'startup.{role}.{key}'] = ms
+    return metrics
+
+
+def compare(old, new):
+    old_metrics, new_metrics = flatten(old), flatten(new)
+    regressions = 0
+    print(f"\nCompared with {old['meta'].get('commit')} ({old['meta'].get('time')}):")
+    for key in sorted(new_metrics):
+        if key not in old_metrics or not old_metrics[key]:
+            continue
+        change = new_metrics[key] / old_metrics[key] - 1
+        flag = ' REGRESSION' if change > REGRESSION_THRESHOLD else ''
+        regressions += bool(flag)
+        print(f"  {key:40} {old_metrics[key]:9.2f} -> {new_metrics[key]:9.2f} ms ({change:+.0%}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vision pipeline and the solvers.")
+    parser.add_argument('--suite', choices=('vision', 'solver', 'sizes', 'startup', 'upload', 'all'), default='all')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--out', help="write results to this JSON file")
+    parser.add_argument('--compare', help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    results = {'meta': metadata()}
+    if args.suite in ('vision', 'all'):
+        results['vision'] = bench_vision(args.repeats)
+    if args.suite in ('solver', 'all'):
+        results['solver'] = bench_solver(args.repeats)
+    if args.suite in ('sizes', 'all'):
+        results['sizes'] = bench_sizes(args.repeats)
+    if args.suite in ('startup', 'all'):
+        results['startup'] = bench_startup(args.repeats)
+    if args.suite in ('upload', 'all'):
+        results['upload'] = bench_upload(args.repeats)
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.out}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
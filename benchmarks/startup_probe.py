@@ -0,0 +1,47 @@
+import json
+import os
+import sys
+import time
+
+# Cold-start probe run in a fresh interpreter by benchmark.py --suite startup. Kept free of
+# project imports at module level so that only what app.py itself pulls in gets measured.
+#
+#   python benchmarks/startup_probe.py solver   # OCR_WARMUP=off, first /solve
+#   python benchmarks/startup_probe.py full     # OCR_WARMUP=sync, first /scan
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+PUZZLE = '530070000600195000098000060800060003400803001700020006060000280000419005000080079'
+IMAGE = os.path.join(ROOT, 'test', 'Images', 'testImage1.jpg')
+
+
+def main(role):
+    start = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)  # model paths are relative to the project root
+
+    import app
+    timings = {'import': (time.perf_counter() - start) * 1000}
+
+    app.create_app('off' if role == 'solver' else 'sync')
+    timings['ready'] = (time.perf_counter() - start) * 1000
+
+    client = app.app.test_client()
+    if role == 'solver':
+        grid = [[int(ch) for ch in PUZZLE[r * 9:r * 9 + 9]] for r in range(9)]
+        response = client.post('/solve', json={'grid': grid})
+    else:
+        with open(IMAGE, 'rb') as f:
+            response = client.post('/scan', data=f.read(), content_type='application/octet-stream')
+    timings['first_response'] = (time.perf_counter() - start) * 1000
+
+    print(json.dumps({
+        'timings': timings,
+        'status': response.status_code,
+        'warmup': app._warmup,
+        'visionLoaded': 'vision.OCR' in sys.modules,
+        'tensorflowLoaded': 'tensorflow' in sys.modules
+    }))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else 'solver')
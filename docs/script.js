@@ -361,39 +361,77 @@ async function handleOCR() {
   }
 }
 
-// Make a POST request to solve the Sudoku
-async function handleSolveVisual(grid) {
-  const res = await fetch("/solve", {
+// Cheap pre-check: reject unsolvable or ambiguous grids before the full solve
+async function validateGrid(grid) {
+  const res = await fetch("/validate", {
     method: "POST",
     headers: { "Content-Type": "application/json" },
     body: JSON.stringify({ grid })
   });
+  return res.json();
+}
 
-  const result = await res.json();
-  if (!result.success || !result.finalBoard) {
+// Make a POST request to solve the Sudoku
+async function handleSolveVisual(grid) {
+  const check = await validateGrid(grid);
+  if (check.solutions === 0) {
     outputDiv.innerText = "This Sudoku puzzle is unsolvable, or the digits were not recognised correctly.";
     document.getElementById("restart-container").style.display = "block";
     return;
   }
+  if (check.solutions > 1) {
+    outputDiv.innerText = "This grid has more than one solution. Some digits were probably not recognised, please check them.";
+    document.getElementById("restart-container").style.display = "block";
+    return;
+  }
 
-  outputDiv.innerText = "Sudoku solved!";
-  outputDiv.style.display = ""; 
-
-  const finalBoard = result.finalBoard;
   const board = grid.map(row => [...row]);
   showOnly('solved-label', 'solved-board');
   document.getElementById('manual-corner-btn-container').style.display = 'none';
+  renderBoard(board, 'solved-board');
+
+  // Stream steps from the server and animate them as they arrive. Each frame
+  // drains a share of the pending steps, so long searches still finish quickly.
+  const pending = [];
+  let result = null;
+  const source = new EventSource("/solve_stream?grid=" + grid.flat().join(""));
+  source.addEventListener("steps", e => pending.push(...decodeSteps(e.data)));
+  source.addEventListener("done", e => { result = JSON.parse(e.data); source.close(); });
+  source.onerror = () => { if (!result) result = { success: false }; source.close(); };
 
   const delay = ms => new Promise(res => setTimeout(res, ms));
-  for (let row = 0; row < 9; row++) {
-    for (let col = 0; col < 9; col++) {
-      if (board[row][col] === 0) {
-        board[row][col] = finalBoard[row][col];
-        renderBoard(board, 'solved-board');
-        await delay(50);
-      }
+  while (!result || pending.length) {
+    const count = Math.max(1, Math.ceil(pending.length / 40));
+    for (const [row, col, value] of pending.splice(0, count)) {
+      board[row][col] = value;
     }
+    renderBoard(board, 'solved-board');
+    await delay(30);
+  }
+
+  if (!result.success || !result.finalBoard) {
+    outputDiv.innerText = "This Sudoku puzzle is unsolvable, or the digits were not recognised correctly.";
+    document.getElementById("restart-container").style.display = "block";
+    return;
+  }
+
+  outputDiv.innerText = "Sudoku solved!";
+  outputDiv.style.display = ""; 
+  renderBoard(result.finalBoard, 'solved-board');
+}
+
+// Decode packed steps from /solve and /solve_stream: base64 of little-endian uint16 values,
+// each holding cell index << 4 | value (value 0 means the cell was cleared)
+function decodeSteps(encoded) {
+  const bytes = Uint8Array.from(atob(encoded), c => c.charCodeAt(0));
+  const view = new DataView(bytes.buffer);
+  const steps = [];
+  for (let i = 0; i + 1 < bytes.length; i += 2) {
+    const code = view.getUint16(i, true);
+    const cell = code >> 4;
+    steps.push([Math.floor(cell / 9), cell % 9, code & 0xF]);
   }
+  return steps;
 }
 
 // --- Reset/cancel actions ---
@@ -0,0 +1,128 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+# Perceptual hash size: dhash compares neighbouring pixels of a DHASH_SIZE x DHASH_SIZE
+# grayscale thumbnail, giving DHASH_SIZE**2 bits. 16 (256 bits) is fine enough that
+# different puzzles printed in the same layout do not collide.
+DHASH_SIZE = 16
+
+
+def content_hash(image):
+    """
+    Exact hash of the decoded pixels (and shape), independent of the file encoding.
+    """
+    digest = hashlib.sha1()
+    digest.update(repr(image.shape).encode())
+    digest.update(memoryview(np.ascontiguousarray(image)).cast('B'))
+    return digest.hexdigest()
+
+
+def dhash(image, size=DHASH_SIZE):
+    """
+    Difference hash: one bit per horizontally adjacent pixel pair of a small grayscale
+    thumbnail. Re-encoded, resized or slightly recompressed copies of a photo hash to
+    (nearly) the same value. Returned as a Python int.
+    """
+    # Shrink by an integer factor first (INTER_AREA fast path), then convert to grayscale,
+    # so no full-resolution grayscale copy is made, then shrink to the thumbnail size
+    h, w = image.shape[:2]
+    factor = max(1, min(h // (8 * size), w // (8 * (size + 1))))
+    if factor > 1:
+        image = cv2.resize(image[:h - h % factor, :w - w % factor], (w // factor, h // factor), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+    thumb = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = (thumb[:, 1:] > thumb[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def image_fingerprint(image):
+    """
+    Everything the cache needs to look up an image: (content hash, dhash, (height, width)).
+    """
+    return content_hash(image), dhash(image), image.shape[:2]
+
+
+class ImageResultCache:
+    """
+    Bounded LRU of pipeline results per uploaded image: the detected board corners
+    and, once OCR has run on the warp from those corners, the recognized board.
+    Lookups first try the exact content hash, then any entry whose dhash is within
+    max_distance bits and has the same aspect ratio (corners are rescaled to the new
+    size). Near hits only reuse the corners: a small edit to a digit barely moves the
+    dhash, so the board is only returned for the exact image. Safe to share between
+    Flask threads.
+    """
+
+    def __init__(self, max_entries=256, max_distance=16):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.entries = OrderedDict()  # content hash -> {'dhash', 'shape', 'corners', 'board'}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    def _find_near(self, phash, shape):
+        """
+        Closest entry by dhash Hamming distance within max_distance. Must hold the lock.
+        """
+        best_key, best_distance = None, self.max_distance + 1
+        for key, entry in self.entries.items():
+            h, w = entry['shape']
+            if abs(h * shape[1] - w * shape[0]) > 0.01 * h * shape[1]:
+                continue  # different aspect ratio
+            distance = bin(entry['dhash'] ^ phash).count('1')
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+        return best_key
+
+    def get(self, fingerprint):
+        """
+        Returns {'corners': 4x2 list in this image's pixels, 'board': 9x9 list or None}
+        for a cached identical or near-identical image, or None. 'board' is None on
+        near hits, so OCR is rerun on the warp from the reused corners.
+        """
+        key, phash, shape = fingerprint
+        with self.lock:
+            entry = self.entries.get(key)
+            board = entry['board'] if entry is not None else None
+            if entry is not None:
+                self.hits += 1
+            else:
+                near_key = self._find_near(phash, shape)
+                if near_key is None:
+                    self.misses += 1
+                    return None
+                self.near_hits += 1
+                key, entry = near_key, self.entries[near_key]
+            self.entries.move_to_end(key)
+
+            scale_y, scale_x = shape[0] / entry['shape'][0], shape[1] / entry['shape'][1]
+            corners = [[x * scale_x, y * scale_y] for x, y in entry['corners']]
+            return {'corners': corners, 'board': board}
+
+    def put(self, fingerprint, corners, board=None):
+        """
+        Records the corners used to warp this image, and the OCR board of that warp if known.
+        """
+        key, phash, shape = fingerprint
+        with self.lock:
+            self.entries[key] = {
+                'dhash': phash,
+                'shape': tuple(shape),
+                'corners': [[float(x), float(y)] for x, y in corners],
+                'board': [row[:] for row in board] if board is not None else None
+            }
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        return {
+            'entries': len(self.entries), 'hits': self.hits,
+            'nearHits': self.near_hits, 'misses': self.misses
+        }
@@ -0,0 +1,150 @@
+import functools
+import os
+import sys
+import threading
+import time
+
+# Latency histograms, counters and gauges for the hot paths, rendered in the
+# Prometheus text format by app.py's /metrics endpoint. Kept dependency-free so
+# the vision and solver modules can record into it cheaply.
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+NODE_BUCKETS = (0, 10, 100, 1000, 10000, 100000, 1000000)
+STEP_BUCKETS = (0, 100, 500, 1000, 5000, 10000, 50000, 100000)
+BATCH_BUCKETS = (1, 4, 16, 32, 64, 81, 128, 256, 512)
+
+
+class Metrics:
+    """
+    Thread-safe registry of counters, gauges and histograms, keyed by name and labels.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.help = {}  # name -> (type, help text)
+        self.values = {}  # (name, labels) -> float, for counters and gauges
+        self.histograms = {}  # (name, labels) -> [bucket bounds, bucket counts, sum, count]
+
+    def describe(self, name, kind, text):
+        self.help[name] = (kind, text)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.values[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [buckets, [0] * len(buckets), 0.0, 0]
+            bounds, counts = histogram[0], histogram[1]
+            for i, bound in enumerate(bounds):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            histogram[2] += value
+            histogram[3] += 1
+
+    def render(self):
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        def fmt(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+        with self.lock:
+            values = dict(self.values)
+            histograms = {key: (h[0], list(h[1]), h[2], h[3]) for key, h in self.histograms.items()}
+
+        lines = []
+        names = sorted({name for name, _ in values} | {name for name, _ in histograms})
+        for name in names:
+            kind, text = self.help.get(name, ('untyped', ''))
+            lines.append(f'# HELP {name} {text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for (metric, labels), value in sorted(values.items()):
+                if metric == name:
+                    lines.append(f'{name}{fmt(labels)} {value}')
+            for (metric, labels), (bounds, counts, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(bounds, counts):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{fmt(labels, [("le", bound)])} {cumulative}')
+                lines.append(f'{name}_bucket{fmt(labels, [("le", "+Inf")])} {count}')
+                lines.append(f'{name}_sum{fmt(labels)} {total}')
+                lines.append(f'{name}_count{fmt(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Metrics()
+registry.describe('sudoku_stage_seconds', 'histogram', 'Latency of pipeline stages (OpenCV, inference) by function.')
+registry.describe('sudoku_stage_errors_total', 'counter', 'Pipeline stage calls that raised.')
+registry.describe('sudoku_ocr_batch_cells', 'histogram', 'Cells per model forward pass.')
+registry.describe('sudoku_solver_nodes', 'histogram', 'Search nodes per solve.')
+registry.describe('sudoku_solver_steps', 'histogram', 'Recorded steps per solve.')
+registry.describe('sudoku_solver_seconds', 'histogram', 'Search time per solve.')
+registry.describe('sudoku_solves_total', 'counter', 'Searches by solver and outcome.')
+registry.describe('sudoku_request_seconds', 'histogram', 'HTTP request latency by endpoint.')
+registry.describe('sudoku_requests_total', 'counter', 'HTTP requests by endpoint and status.')
+registry.describe('process_peak_rss_bytes', 'gauge', 'Peak resident set size of this process.')
+registry.describe('process_rss_bytes', 'gauge', 'Current resident set size of this process.')
+
+
+def timed(stage):
+    """
+    Decorator recording the wrapped function's latency as sudoku_stage_seconds{stage=...}.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                registry.inc('sudoku_stage_errors_total', stage=stage)
+                raise
+            finally:
+                registry.observe('sudoku_stage_seconds', time.perf_counter() - start, stage=stage)
+        return wrapper
+    return decorator
+
+
+def observe_search(solver, outcome, nodes, elapsed_ms, steps=None):
+    """
+    Solver hook (see solver.search_observer): node count, time and step count of one search.
+    """
+    registry.inc('sudoku_solves_total', solver=solver, outcome=outcome)
+    registry.observe('sudoku_solver_nodes', nodes, buckets=NODE_BUCKETS, solver=solver)
+    registry.observe('sudoku_solver_seconds', elapsed_ms / 1000, solver=solver)
+    if steps is not None:
+        registry.observe('sudoku_solver_steps', steps, buckets=STEP_BUCKETS, solver=solver)
+
+
+def update_memory_gauges():
+    """
+    Refreshes the RSS gauges. The peak is skipped where the resource module is missing
+    (Windows); ru_maxrss is in KiB on Linux and already in bytes on macOS.
+    """
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        registry.set('process_peak_rss_bytes', peak if sys.platform == 'darwin' else peak * 1024)
+    try:
+        with open('/proc/self/statm') as f:
+            registry.set('process_rss_bytes', int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE'))
+    except (OSError, ValueError):
+        pass
@@ -0,0 +1,69 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import tensorflow as tf
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from vision.tflite_model import TFLiteDigitModel
+from models.quantize_model import load_test_cells
+
+# Compares the float Keras model with the int8 TFLite model: accuracy on the
+# MNIST test set (when it can be loaded), agreement on our cropped test cells,
+# model size and batch latency.
+
+
+def time_batches(predict, x, repeats):
+    predict(x)  # warm-up
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict(x)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def main(model_path, int8_path, batch_size, repeats):
+    model = tf.keras.models.load_model(model_path)
+    int8_model = TFLiteDigitModel(int8_path)
+
+    def predict_float(x):
+        return model(x, training=False).numpy()
+
+    print(f"Model size: float {os.path.getsize(model_path) / 1024:.0f} KiB, "
+          f"int8 {os.path.getsize(int8_path) / 1024:.0f} KiB")
+
+    try:
+        (_, _), (x_test, y_test) = tf.keras.datasets.mnist.load_data()
+        x_test = (x_test[..., None] / 255.0).astype(np.float32)
+        float_acc = np.mean(predict_float(x_test).argmax(axis=1) == y_test)
+        int8_acc = np.mean(int8_model.predict(x_test).argmax(axis=1) == y_test)
+        print(f"MNIST test accuracy: float {float_acc:.2%}, int8 {int8_acc:.2%}")
+    except Exception as e:
+        print(f"MNIST unavailable ({e}), skipping accuracy")
+
+    cells = load_test_cells()
+    if len(cells):
+        agree = np.mean(predict_float(cells).argmax(axis=1) == int8_model.predict(cells).argmax(axis=1))
+        print(f"Test cell agreement (int8 vs float): {agree:.2%} over {len(cells)} cells")
+
+    x = np.random.default_rng(0).random((batch_size, 28, 28, 1), dtype=np.float32)
+    float_ms = time_batches(predict_float, x, repeats)
+    int8_ms = time_batches(int8_model.predict, x, repeats)
+    print(f"Median latency for a batch of {batch_size}: float {float_ms:.2f} ms, int8 {int8_ms:.2f} ms "
+          f"({float_ms / int8_ms:.1f}x)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare the float and int8 digit models.")
+    parser.add_argument('--model', default='models/mnist_model.h5')
+    parser.add_argument('--int8', default='models/mnist_model_int8.tflite')
+    parser.add_argument('--batch-size', type=int, default=81)
+    parser.add_argument('--repeats', type=int, default=50)
+    args = parser.parse_args()
+
+    main(args.model, args.int8, args.batch_size, args.repeats)
@@ -0,0 +1,132 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.layers import Conv2D, MaxPooling2D, Flatten, Dense, Dropout, BatchNormalization
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from vision.numpy_model import NumpyDigitModel
+
+# Exports mnist_model.h5 to a compact .npz for vision/numpy_model.py.
+# BatchNorm layers sit after the ReLU in this architecture, so they are folded
+# forward into the next Dense layer (exact). A BatchNorm followed by pooling is
+# only moved past the pool when all its scales are positive, and one followed
+# by a padded convolution is kept as a cheap per-channel scale/shift, since
+# folding it would change the zero padding at the borders.
+
+
+def keras_to_ops(model):
+    """
+    Converts the Keras layers into a list of (layer, activation, w, b) ops.
+    """
+    ops = []
+    for layer in model.layers:
+        if isinstance(layer, Conv2D):
+            if layer.strides != (1, 1) or layer.padding != 'same':
+                raise ValueError(f"{layer.name}: only stride 1 'same' convolutions are supported")
+            kernel, bias = layer.get_weights()
+            ops.append(['conv', layer.activation.__name__, kernel, bias])
+        elif isinstance(layer, BatchNormalization):
+            gamma, beta, mean, var = layer.get_weights()
+            scale = gamma / np.sqrt(var + layer.epsilon)
+            ops.append(['affine', 'linear', scale, beta - mean * scale])
+        elif isinstance(layer, MaxPooling2D):
+            if tuple(layer.pool_size) != (2, 2) or tuple(layer.strides) != (2, 2):
+                raise ValueError(f"{layer.name}: only 2x2 pooling with stride 2 is supported")
+            ops.append(['pool', 'linear', None, None])
+        elif isinstance(layer, Flatten):
+            ops.append(['flatten', 'linear', None, None])
+        elif isinstance(layer, Dense):
+            kernel, bias = layer.get_weights()
+            ops.append(['dense', layer.activation.__name__, kernel, bias])
+        elif isinstance(layer, Dropout):
+            continue  # no-op at inference
+        else:
+            raise ValueError(f"Unsupported layer: {layer.name} ({type(layer).__name__})")
+    return ops
+
+
+def fold_batchnorm(ops):
+    """
+    Folds each affine op into the next Dense layer where that is exact.
+    """
+    folded = []
+    for i, op in enumerate(ops):
+        if op[0] != 'affine':
+            folded.append(op)
+            continue
+
+        scale, shift = op[2], op[3]
+        j = i + 1
+        while ops[j][0] == 'flatten' or (ops[j][0] == 'pool' and np.all(scale > 0)):
+            j += 1
+        if ops[j][0] != 'dense':
+            folded.append(op)
+            continue
+
+        # Dense input is channels-last flattened, so per-channel values repeat per position
+        kernel, bias = ops[j][2], ops[j][3]
+        repeats = kernel.shape[0] // scale.shape[0]
+        scale, shift = np.tile(scale, repeats), np.tile(shift, repeats)
+        ops[j][2] = kernel * scale[:, None]
+        ops[j][3] = bias + shift @ kernel
+    return folded
+
+
+def export(model_path, out_path):
+    model = tf.keras.models.load_model(model_path)
+    ops = fold_batchnorm(keras_to_ops(model))
+
+    arrays = {
+        'layers': np.array([op[0] for op in ops]),
+        'activations': np.array([op[1] for op in ops]),
+    }
+    for i, (_, _, w, b) in enumerate(ops):
+        if w is not None:
+            arrays[f'{i}_w'] = w.astype(np.float32)
+            arrays[f'{i}_b'] = b.astype(np.float32)
+    np.savez_compressed(out_path, **arrays)
+    print(f"Exported {len(ops)} ops ({', '.join(op[0] for op in ops)}) to {out_path}")
+    return model
+
+
+def sample_inputs(samples=256):
+    """
+    MNIST test digits when they can be loaded, otherwise random images.
+    """
+    try:
+        (_, _), (x_test, _) = tf.keras.datasets.mnist.load_data()
+        return (x_test[:samples, ..., None] / 255.0).astype(np.float32)
+    except Exception as e:
+        print(f"MNIST unavailable ({e}), checking on random images instead")
+        return np.random.default_rng(0).random((samples, 28, 28, 1), dtype=np.float32)
+
+
+def check(model, out_path, samples=256):
+    """
+    Compares the NumPy runtime against Keras on the same inputs.
+    """
+    x = sample_inputs(samples)
+    expected = model(x, training=False).numpy()
+    actual = NumpyDigitModel(out_path).predict(x)
+
+    max_diff = float(np.abs(expected - actual).max())
+    agree = float(np.mean(expected.argmax(axis=1) == actual.argmax(axis=1)))
+    print(f"Max abs probability difference: {max_diff:.2e}, argmax agreement: {agree:.2%}")
+    return max_diff
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export the digit CNN to a NumPy .npz model.")
+    parser.add_argument('--model', default='models/mnist_model.h5')
+    parser.add_argument('--out', default='models/mnist_model.npz')
+    parser.add_argument('--check', action='store_true', help="compare outputs against Keras on MNIST")
+    args = parser.parse_args()
+
+    keras_model = export(args.model, args.out)
+    if args.check:
+        check(keras_model, args.out)
@@ -0,0 +1,92 @@
+import argparse
+import glob
+import os
+import sys
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.preprocessing.image import ImageDataGenerator
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from vision.preprocessing import preprocess_image, preprocess_for_model, split_cells
+from vision.grid_detection import find_sudoku_contour, get_perspective_transform
+from vision.OCR import is_blank
+
+# Int8 post-training quantization of the digit CNN to a TFLite model.
+# Weights and activations are int8 (per-channel weight scales); the model keeps
+# float32 input/output so vision/OCR.py can feed it the same batches.
+
+
+def load_test_cells(pattern='test/Images/*.jpg'):
+    """
+    Runs the vision pipeline over the test images and returns the preprocessed
+    non-blank cells as a (N, 28, 28, 1) float32 array.
+    """
+    tensors = []
+    for path in sorted(glob.glob(pattern)):
+        try:
+            original, thresh = preprocess_image(path)
+            warped, _ = get_perspective_transform(original, find_sudoku_contour(thresh))
+        except Exception as e:
+            print(f"Skipping {path}: {e}")
+            continue
+        for row in split_cells(warped):
+            for cell in row:
+                if not is_blank(cell):
+                    tensors.append(preprocess_for_model(cell))
+    return np.concatenate(tensors) if tensors else np.zeros((0, 28, 28, 1), np.float32)
+
+
+def load_augmented_mnist(samples):
+    """
+    Augmented MNIST training digits, using the same augmentation as training.
+    Returns an empty array when MNIST cannot be loaded.
+    """
+    try:
+        (x_train, _), (_, _) = tf.keras.datasets.mnist.load_data()
+    except Exception as e:
+        print(f"MNIST unavailable ({e}), calibrating on test cells only")
+        return np.zeros((0, 28, 28, 1), np.float32)
+
+    x = (x_train[:samples, ..., None] / 255.0).astype(np.float32)
+    datagen = ImageDataGenerator(
+        rotation_range=10,
+        zoom_range=0.1,
+        width_shift_range=0.1,
+        height_shift_range=0.1
+    )
+    return next(datagen.flow(x, batch_size=len(x), shuffle=False)).astype(np.float32)
+
+
+def quantize(model_path, out_path, mnist_samples=500):
+    model = tf.keras.models.load_model(model_path)
+    calibration = np.concatenate([load_augmented_mnist(mnist_samples), load_test_cells()])
+    if not len(calibration):
+        raise ValueError("No calibration data available")
+    print(f"Calibrating on {len(calibration)} images")
+
+    def representative_dataset():
+        for i in range(len(calibration)):
+            yield [calibration[i:i + 1]]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    tflite_model = converter.convert()
+
+    with open(out_path, 'wb') as f:
+        f.write(tflite_model)
+    print(f"Wrote {out_path} ({len(tflite_model) / 1024:.0f} KiB)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Quantize the digit CNN to an int8 TFLite model.")
+    parser.add_argument('--model', default='models/mnist_model.h5')
+    parser.add_argument('--out', default='models/mnist_model_int8.tflite')
+    parser.add_argument('--mnist-samples', type=int, default=500)
+    args = parser.parse_args()
+
+    quantize(args.model, args.out, args.mnist_samples)
@@ -0,0 +1,129 @@
+import heapq
+import math
+
+import numpy as np
+
+from solver import count_solutions, SearchBudget, SolveAborted
+
+# Probabilities are clipped to this before taking logs, so a reading the model
+# gives zero probability is just very unlikely rather than impossible.
+MIN_PROB = 1e-6
+
+
+def top_k_readings(probs, k=3):
+    """
+    Per-cell top-k readings from the (9, 9, 10) OCR probabilities (all zero for blank cells).
+    Returns a 9x9 list holding None for blank cells, else [[digit, prob], ...] best first.
+    Class 0 stands for "no digit", as in the recognized board.
+    """
+    readings = [[None] * 9 for _ in range(9)]
+    for r in range(9):
+        for c in range(9):
+            if probs[r, c].any():
+                order = np.argsort(probs[r, c])[::-1][:k]
+                readings[r][c] = [[int(d), float(probs[r, c, d])] for d in order]
+    return readings
+
+
+def _conflicting_cells(board):
+    """
+    Cells involved in a duplicate within a row, column or box.
+    """
+    cells = set()
+    units = (
+        [[(r, c) for c in range(9)] for r in range(9)] +
+        [[(r, c) for r in range(9)] for c in range(9)] +
+        [[(br + i // 3, bc + i % 3) for i in range(9)] for br in range(0, 9, 3) for bc in range(0, 9, 3)]
+    )
+    for unit in units:
+        seen = {}
+        for r, c in unit:
+            value = board[r][c]
+            if value:
+                if value in seen:
+                    cells.update((seen[value], (r, c)))
+                else:
+                    seen[value] = (r, c)
+    return cells
+
+
+def correct_board(board, probs, top_k=3, max_changes=3, max_tries=200, timeout=None, max_nodes=None):
+    """
+    Finds the most probable reading of the board that has exactly one solution.
+    Alternative readings of the recognized cells are tried in order of joint confidence
+    (best-first over sets of changes, each cell taking its 2nd..top_k-th reading), with
+    at most max_changes changed cells and max_tries uniqueness checks.
+    If the board has duplicates, only change sets touching a conflicting cell are checked.
+    Returns a dict with 'board' (corrected, or the input if nothing was found), 'unique',
+    'changes' ([{'row', 'col', 'from', 'to', 'prob'}]), 'confidence' (joint probability of
+    the chosen readings relative to the argmax readings) and 'tries'.
+    `timeout` (seconds) and `max_nodes` bound all uniqueness checks together; when they run
+    out the input board is returned as not unique, with 'aborted' (the search statistics).
+    """
+    readings = top_k_readings(probs, top_k)
+    # (cost of the reading relative to the argmax, row, col, digit, prob) per alternative rank
+    alternatives = []
+    for r in range(9):
+        for c in range(9):
+            cell = readings[r][c]
+            if cell is None or len(cell) < 2:
+                continue
+            best = math.log(max(cell[0][1], MIN_PROB))
+            alternatives.append([
+                (best - math.log(max(p, MIN_PROB)), r, c, d, p) for d, p in cell[1:]
+            ])
+    # Cheapest first change first, so "replace the last change by the next cell" never lowers the cost
+    alternatives.sort(key=lambda alts: alts[0][0])
+    conflicts = _conflicting_cells(board)
+
+    def apply(changes):
+        candidate = [row[:] for row in board]
+        for position, rank in changes:
+            _, r, c, d, _ = alternatives[position][rank]
+            candidate[r][c] = d
+        return candidate
+
+    # Each change set is a tuple of (position, rank) with increasing positions. Every set has
+    # exactly one parent (drop / demote / shift its last change), so each is generated once,
+    # and children never cost less than their parent, so the heap pops in cost order.
+    heap = [(0.0, ())]
+    tries = 0
+    budget = SearchBudget(timeout, max_nodes)
+    while heap and tries < max_tries:
+        cost, changes = heapq.heappop(heap)
+        touched = {alternatives[p][rank][1:3] for p, rank in changes}
+        if not conflicts or touched & conflicts:
+            candidate = apply(changes)
+            tries += 1
+            solutions = count_solutions(candidate, limit=2, budget=budget)  # 0 for boards with duplicates
+            if isinstance(solutions, SolveAborted):
+                return {
+                    'board': board, 'unique': False, 'changes': [], 'confidence': 1.0,
+                    'tries': tries, 'aborted': solutions.to_dict()
+                }
+            if solutions == 1:
+                return {
+                    'board': candidate,
+                    'unique': True,
+                    'changes': [
+                        dict(zip(('row', 'col', 'from', 'to', 'prob'), (r, c, board[r][c], d, prob)))
+                        for _, r, c, d, prob in (alternatives[position][k] for position, k in changes)
+                    ],
+                    'confidence': math.exp(-cost),
+                    'tries': tries
+                }
+
+        last, rank = changes[-1] if changes else (-1, 0)
+        children = []
+        if changes and rank + 1 < len(alternatives[last]):
+            children.append(changes[:-1] + ((last, rank + 1),))
+        if last + 1 < len(alternatives):
+            if len(changes) < max_changes:
+                children.append(changes + ((last + 1, 0),))
+            if changes and rank == 0:
+                children.append(changes[:-1] + ((last + 1, 0),))
+        for child in children:
+            child_cost = sum(alternatives[p][k][0] for p, k in child)
+            heapq.heappush(heap, (child_cost, child))
+
+    return {'board': board, 'unique': False, 'changes': [], 'confidence': 1.0, 'tries': tries}
@@ -0,0 +1,382 @@
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+class DiskSessionBackend:
+    """
+    Stores session images as files under root/<shard>/<session_id>/<name>.png, the shard
+    being the first `shard_chars` characters of the ID, so sessions survive restarts and can
+    be shared between worker processes without any one directory growing with their number.
+    A session folder's mtime is its last use: sessions unused for `ttl_seconds` and, beyond
+    that, the least recently used ones over `max_bytes` on disk are deleted by sweep(),
+    which runs outside the request path (start_sweeper() or `python session_store.py`).
+    With `sweep_interval` set, the sweeper also starts by itself with the first session
+    created, so nothing piles up when the app is served without create_app().
+    """
+
+    def __init__(self, root, ttl_seconds=1800, max_bytes=1024 * 1024 * 1024, shard_chars=2, sweep_interval=None):
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.shard_chars = shard_chars
+        self.sweep_interval = sweep_interval
+        self.last_sweep = None  # stats of the most recent sweep
+        self._stop = threading.Event()
+        self._sweeper = None
+        self._sweeper_lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, session_id, name=None):
+        if name is not None and (os.path.basename(name) != name or name.startswith('.')):
+            raise FileNotFoundError("Session file not found")  # no paths outside the session folder
+        path = os.path.join(self.root, session_id[:self.shard_chars], session_id)
+        return os.path.join(path, f'{name}.png') if name else path
+
+    def create(self, session_id):
+        if self.sweep_interval and self._sweeper is None and not self._stop.is_set():
+            self.start_sweeper(self.sweep_interval)  # not after an explicit stop_sweeper()
+        os.makedirs(self._path(session_id), exist_ok=True)
+
+    def touch(self, session_id):
+        """
+        Marks the session as used now, postponing its expiry.
+        """
+        try:
+            os.utime(self._path(session_id))
+        except OSError:
+            pass
+
+    def exists(self, session_id):
+        try:
+            return time.time() - os.stat(self._path(session_id)).st_mtime <= self.ttl_seconds
+        except OSError:
+            return False
+
+    def save(self, session_id, name, image, encoded=None):
+        """
+        Writes the image as <name>.png. `encoded` bytes are written as-is only if they
+        already are a PNG; other formats (JPEG uploads) are re-encoded, since the files
+        are served back as image/png.
+        """
+        path = self._path(session_id, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)  # may have been swept meanwhile
+        if encoded is not None and bytes(encoded[:len(PNG_SIGNATURE)]) == PNG_SIGNATURE:
+            with open(path, 'wb') as f:
+                f.write(encoded)
+        else:
+            cv2.imwrite(path, image)
+        self.touch(session_id)
+
+    def load(self, session_id, name):
+        path = self._path(session_id, name)
+        return cv2.imread(path, cv2.IMREAD_UNCHANGED) if os.path.exists(path) else None
+
+    def load_encoded(self, session_id, name):
+        path = self._path(session_id, name)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def _scan(self):
+        """
+        (mtime, size in bytes, path) of every session folder, including folders from the
+        earlier unsharded layout (root/<session_id>).
+        """
+        sessions = []
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if not entry.is_dir():
+                    continue
+                if len(entry.name) == self.shard_chars:
+                    with os.scandir(entry.path) as shard:
+                        folders = [folder for folder in shard if folder.is_dir()]
+                else:
+                    folders = [entry]
+                for folder in folders:
+                    try:
+                        with os.scandir(folder.path) as files:
+                            size = sum(f.stat().st_size for f in files if f.is_file())
+                        sessions.append((folder.stat().st_mtime, size, folder.path))
+                    except OSError:
+                        continue  # deleted while scanning
+        return sessions
+
+    def sweep(self):
+        """
+        Deletes expired sessions, then the least recently used ones while over max_bytes.
+        Returns {'sessions', 'bytes', 'removed'} after the sweep.
+        """
+        sessions = sorted(self._scan())
+        now = time.time()
+        total = sum(size for _, size, _ in sessions)
+        removed = 0
+        for mtime, size, path in sessions:
+            if now - mtime <= self.ttl_seconds and total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+        self.last_sweep = {'sessions': len(sessions) - removed, 'bytes': total, 'removed': removed}
+        return self.last_sweep
+
+    def start_sweeper(self, interval=60):
+        """
+        Sweeps every `interval` seconds in a daemon thread until stop_sweeper().
+        """
+        with self._sweeper_lock:
+            if self._sweeper is not None:
+                return
+
+            def run():
+                while not self._stop.wait(interval):
+                    try:
+                        self.sweep()
+                    except OSError as e:
+                        print(f"Session sweep failed: {e}")
+            self._stop.clear()
+            self._sweeper = threading.Thread(target=run, name='session-sweeper', daemon=True)
+            self._sweeper.start()
+
+    def stop_sweeper(self):
+        with self._sweeper_lock:
+            self._stop.set()
+            if self._sweeper is not None:
+                self._sweeper.join()
+                self._sweeper = None
+
+    def stats(self):
+        return self.last_sweep
+
+
+class SessionStore:
+    """
+    In-process LRU of decoded session images (numpy arrays), so pipeline stages
+    hand images to each other without encoding and re-reading files.
+    Sessions expire `ttl_seconds` after their last use, and the least recently
+    used sessions are dropped once the arrays exceed `max_bytes`.
+    With a backend (e.g. DiskSessionBackend) every image is also written through,
+    and images evicted from memory are reloaded from it on demand. Without one,
+    the `rebuildable` images (those the caller can recompute from the rest of the
+    session) are dropped first, so live sessions are only lost as a last resort.
+    Safe to share between Flask threads.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, ttl_seconds=1800, backend=None, rebuildable=()):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self.rebuildable = rebuildable
+        # session_id -> {'images': {name: array}, 'meta': dict, 'bytes': int, 'last_used': float, 'disk_touched': float}
+        self.sessions = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _check_id(session_id):
+        try:
+            uuid.UUID(session_id)
+        except (TypeError, ValueError):
+            raise FileNotFoundError("Session not found")
+
+    def create(self):
+        session_id = str(uuid.uuid4())
+        now = time.monotonic()
+        with self.lock:
+            self.sessions[session_id] = {'images': {}, 'meta': {}, 'bytes': 0, 'last_used': now, 'disk_touched': now}
+            self._evict()
+        if self.backend is not None:
+            self.backend.create(session_id)
+        return session_id
+
+    def _touch(self, session_id):
+        """
+        Returns the in-memory session, marking it as recently used. Must hold the lock.
+        """
+        session = self.sessions.get(session_id)
+        if session is None:
+            if self.backend is None or not self.backend.exists(session_id):
+                raise FileNotFoundError("Session not found")
+            session = self.sessions[session_id] = {'images': {}, 'meta': {}, 'bytes': 0, 'last_used': 0, 'disk_touched': 0}
+        now = time.monotonic()
+        # Throttled on the last disk touch, not the last use: a busy session is used far more
+        # often than every ttl/10, and rewriting its files does not bump the folder mtime
+        if self.backend is not None and now - session['disk_touched'] > self.ttl_seconds / 10:
+            self.backend.touch(session_id)  # keep the disk copy from expiring while in use
+            session['disk_touched'] = now
+        session['last_used'] = now
+        self.sessions.move_to_end(session_id)
+        return session
+
+    def put(self, session_id, name, image, encoded=None):
+        """
+        Stores a decoded image. `encoded` optionally holds the original file bytes,
+        which a backend can write as-is instead of re-encoding.
+        """
+        self._check_id(session_id)
+        with self.lock:
+            session = self._touch(session_id)
+            old = session['images'].get(name)
+            if old is not None:
+                session['bytes'] -= old.nbytes
+                self.total_bytes -= old.nbytes
+            session['images'][name] = image
+            session['bytes'] += image.nbytes
+            self.total_bytes += image.nbytes
+            self._evict(keep=session_id)
+        if self.backend is not None:
+            self.backend.save(session_id, name, image, encoded)
+
+    def get(self, session_id, name):
+        """
+        Returns the decoded image, or None if the session has no image by that name.
+        Raises FileNotFoundError for unknown or expired sessions.
+        """
+        self._check_id(session_id)
+        with self.lock:
+            session = self._touch(session_id)
+            image = session['images'].get(name)
+        if image is None and self.backend is not None:
+            image = self.backend.load(session_id, name)
+            if image is not None:
+                with self.lock:
+                    # Evicted, or loaded by another thread, while the file was read
+                    if self.sessions.get(session_id) is session and name not in session['images']:
+                        session['images'][name] = image
+                        session['bytes'] += image.nbytes
+                        self.total_bytes += image.nbytes
+                        self._evict(keep=session_id)
+        return image
+
+    def get_png(self, session_id, name):
+        """
+        PNG bytes of a session image, encoded only now that it is requested.
+        Returns None if there is no such image.
+        """
+        self._check_id(session_id)
+        with self.lock:
+            image = self._touch(session_id)['images'].get(name)
+        if image is None and self.backend is not None:
+            return self.backend.load_encoded(session_id, name)
+        if image is None:
+            return None
+        ok, buf = cv2.imencode('.png', image)
+        return buf.tobytes() if ok else None
+
+    def set_meta(self, session_id, key, value):
+        """
+        Stores a small non-image value (hashes, corners, ...) with the session. Memory only.
+        """
+        self._check_id(session_id)
+        with self.lock:
+            self._touch(session_id)['meta'][key] = value
+
+    def get_meta(self, session_id, key, default=None):
+        self._check_id(session_id)
+        with self.lock:
+            return self._touch(session_id)['meta'].get(key, default)
+
+    def _evict(self, keep=None):
+        """
+        Drops expired sessions, then (without a backend) rebuildable images and finally least
+        recently used sessions while over budget. Must hold the lock.
+        """
+        now = time.monotonic()
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if session_id == keep or now - session['last_used'] <= self.ttl_seconds:
+                break
+            self.sessions.popitem(last=False)
+            self.total_bytes -= session['bytes']
+
+        if self.backend is None and self.total_bytes > self.max_bytes:
+            for session_id, session in self.sessions.items():
+                if session_id == keep:
+                    continue
+                for name in self.rebuildable:
+                    image = session['images'].pop(name, None)
+                    if image is not None:
+                        session['bytes'] -= image.nbytes
+                        self.total_bytes -= image.nbytes
+                if self.total_bytes <= self.max_bytes:
+                    break
+
+        while self.sessions and self.total_bytes > self.max_bytes:
+            session_id, session = next(iter(self.sessions.items()))
+            if session_id == keep:
+                break
+            self.sessions.popitem(last=False)
+            self.total_bytes -= session['bytes']
+
+    def stats(self):
+        with self.lock:
+            stats = {'sessions': len(self.sessions), 'bytes': self.total_bytes}
+        if self.backend is not None:
+            stats['disk'] = self.backend.stats()
+        return stats
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+def read_upload(stream, limit, length=None, chunk_size=64 * 1024):
+    """
+    Reads an upload stream in chunks into a single buffer and returns a memoryview of the
+    data. Raises UploadTooLarge as soon as more than `limit` bytes have arrived (or up front,
+    if the announced `length` is over it). With `length` known the buffer is allocated once
+    and filled in place, otherwise it grows by doubling.
+    """
+    if length is not None and length > limit:
+        raise UploadTooLarge("Image too large")
+    buf = bytearray(length + 1 if length else chunk_size)  # +1 so reading to the end needs no growth
+    size = 0
+    while True:
+        if size == len(buf):
+            buf.extend(bytes(min(size, limit + 1 - size)))  # room to notice one byte too many
+        with memoryview(buf) as view:
+            read = stream.readinto(view[size:size + chunk_size])
+        if not read:
+            return memoryview(buf)[:size]
+        size += read
+        if size > limit:
+            raise UploadTooLarge("Image too large")
+
+
+def decode_image(data):
+    """
+    Decodes encoded image bytes (PNG, JPEG, ...; any bytes-like object, without copying it)
+    into a BGR array. Raises ValueError if unreadable.
+    """
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Could not decode image")
+    return image
+
+
+if __name__ == '__main__':
+    import argparse
+
+    # Standalone sweeper, for deployments where the web workers run with SESSION_SWEEP_S=0
+    parser = argparse.ArgumentParser(description="Delete expired and over-quota session folders.")
+    parser.add_argument('root', nargs='?', default='sessions')
+    parser.add_argument('--ttl', type=float, default=1800, help="seconds since last use")
+    parser.add_argument('--max-mb', type=float, default=1024, help="disk quota for all sessions")
+    parser.add_argument('--interval', type=float, default=0, help="repeat every this many seconds")
+    args = parser.parse_args()
+
+    backend = DiskSessionBackend(args.root, ttl_seconds=args.ttl, max_bytes=int(args.max_mb * 1024 * 1024))
+    while True:
+        print(backend.sweep())
+        if not args.interval:
+            break
+        time.sleep(args.interval)
@@ -0,0 +1,299 @@
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from itertools import permutations, product
+
+from solver import (
+    is_board_valid, solve_and_record_steps, format_puzzle, encode_steps,
+    decode_steps, SolveAborted, STEP_VALUE_BITS, ROW_OF, COL_OF
+)
+
+# Give up on canonicalizing when this many partial transforms tie (only very
+# sparse grids get there); such grids are keyed as-is, which is still correct
+# but misses hits from their equivalent puzzles.
+MAX_CANON_STATES = 5000
+
+
+def _line_orders():
+    """
+    All 1296 orders of 9 rows (or columns) that keep bands (stacks) together:
+    band order x order within each band.
+    """
+    orders = []
+    for bands in permutations(range(3)):
+        for inner in product(permutations(range(3)), repeat=3):
+            orders.append(tuple(b * 3 + inner[i][k] for i, b in enumerate(bands) for k in range(3)))
+    return orders
+
+
+LINE_ORDERS = _line_orders()
+IDENTITY = (False, tuple(range(9)), tuple(range(9)), tuple(range(10)))
+
+
+def _first_row_orders(row):
+    """
+    Column orders that give the row its smallest blank/clue pattern:
+    stacks sorted by clue count, blanks before clues inside each stack.
+    Returns (sorted clue counts, orders); smaller counts mean a smaller row.
+    """
+    counts, per_stack = [], []
+    for s in range(3):
+        cols = range(s * 3, s * 3 + 3)
+        blanks = [c for c in cols if not row[c]]
+        clues = [c for c in cols if row[c]]
+        counts.append(len(clues))
+        per_stack.append([z + d for z in permutations(blanks) for d in permutations(clues)])
+
+    key = sorted(counts)
+    orders = []
+    for stacks in set(permutations(range(3))):
+        if [counts[s] for s in stacks] != key:
+            continue
+        for inner in product(*(per_stack[s] for s in stacks)):
+            orders.append(sum(inner, ()))
+    return tuple(key), orders
+
+
+def _next_rows(used):
+    """
+    Rows allowed at the next canonical position: any row of a fresh band when
+    starting a band, otherwise an unused row of the current band.
+    """
+    p = len(used)
+    if p % 3 == 0:
+        bands = {r // 3 for r in used}
+        return [r for r in range(9) if r // 3 not in bands]
+    band = used[-1] // 3
+    return [r for r in range(band * 3, band * 3 + 3) if r not in used]
+
+
+def canonical_form(board):
+    """
+    Returns (key, transform) where key is the 81-character minlex form of the
+    board over transposition, band/stack swaps, row/column swaps within bands
+    and stacks, and digit relabeling (blanks sort first). Equivalent puzzles
+    share a key. transform is (transposed, rows, cols, relabel) with
+    key[r][c] == relabel[src[rows[r]][cols[c]]], src being the board or its
+    transpose.
+    """
+    sources = (board, [list(col) for col in zip(*board)])
+
+    # Position 0: the smallest first row only depends on its blank pattern
+    best, candidates = None, []
+    for t, src in enumerate(sources):
+        for r in range(9):
+            key, _ = _first_row_orders(src[r])
+            if best is None or key < best:
+                best, candidates = key, [(t, r)]
+            elif key == best:
+                candidates.append((t, r))
+
+    states = []  # (source, rows so far, cols, relabel, next label)
+    for t, r in candidates:
+        row = sources[t][r]
+        for cols in _first_row_orders(row)[1]:
+            relabel, label = [0] * 10, 1
+            for c in cols:
+                if row[c]:
+                    relabel[row[c]] = label
+                    label += 1
+            states.append((t, (r,), cols, relabel, label))
+        if len(states) > MAX_CANON_STATES:
+            return _identity_key(board), IDENTITY
+
+    for _ in range(1, 9):
+        if len(states) > MAX_CANON_STATES:
+            return _identity_key(board), IDENTITY
+
+        best, survivors = None, []
+        for t, used, cols, relabel, label in states:
+            src = sources[t]
+            for r in _next_rows(used):
+                row = src[r]
+                out, new, nxt = [], {}, label
+                tied = best is not None  # still equal to the best prefix
+                for i, c in enumerate(cols):
+                    v = row[c]
+                    if v:
+                        lab = relabel[v] or new.get(v)
+                        if not lab:
+                            lab = new[v] = nxt
+                            nxt += 1
+                    else:
+                        lab = 0
+                    # Bail out as soon as this row loses to the best so far
+                    if tied and lab != best[i]:
+                        if lab > best[i]:
+                            break
+                        tied = False
+                    out.append(lab)
+                else:
+                    if not tied:
+                        best, survivors = out, []
+                    if new:
+                        merged = relabel[:]
+                        for v, lab in new.items():
+                            merged[v] = lab
+                    else:
+                        merged = relabel
+                    survivors.append((t, used + (r,), cols, merged, nxt))
+        states = survivors
+
+    t, rows, cols, relabel, label = states[0]
+    # Digits missing from the puzzle take the remaining labels in order
+    for v in range(1, 10):
+        if not relabel[v]:
+            relabel[v] = label
+            label += 1
+
+    src = sources[t]
+    key = ''.join(str(relabel[src[r][c]]) for r in rows for c in cols)
+    return key, (bool(t), rows, cols, tuple(relabel))
+
+
+def _identity_key(board):
+    return format_puzzle(board)
+
+
+def _source_cell(transform, cell):
+    """
+    Original-board cell index for a canonical cell index.
+    """
+    transposed, rows, cols, _ = transform
+    r, c = rows[cell // 9], cols[cell % 9]
+    return c * 9 + r if transposed else r * 9 + c
+
+
+def _map_back(transform, solution, steps):
+    """
+    Maps a canonical solution string and packed steps back to the original board.
+    """
+    relabel = transform[3]
+    inverse = [0] * 10
+    for v in range(1, 10):
+        inverse[relabel[v]] = v
+    cell_map = [_source_cell(transform, cell) for cell in range(81)]
+
+    board = [[0] * 9 for _ in range(9)]
+    for cell, ch in enumerate(solution):
+        src = cell_map[cell]
+        board[ROW_OF[src]][COL_OF[src]] = inverse[int(ch)]
+
+    mask = (1 << STEP_VALUE_BITS) - 1
+    mapped = array('H', (
+        cell_map[code >> STEP_VALUE_BITS] << STEP_VALUE_BITS | inverse[code & mask]
+        for code in steps
+    ))
+    return board, mapped
+
+
+class SolveCache:
+    """
+    Bounded LRU of solved canonical puzzles, with an optional sqlite tier that
+    survives restarts. Values are (solution string or '' if unsolvable, packed
+    steps as encode_steps bytes). The memory tier holds at most `max_entries`
+    entries and `max_bytes` of step logs; step logs over `max_entry_bytes` (long
+    searches near the node budget) are not cached in either tier, so neither
+    grows by megabytes per puzzle. Safe to share between Flask threads.
+    """
+
+    def __init__(self, max_entries=1024, db_path=None, max_bytes=64 * 1024 * 1024, max_entry_bytes=256 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+        if db_path:
+            self.db = sqlite3.connect(db_path, check_same_thread=False)
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS solutions (key TEXT PRIMARY KEY, solution TEXT, steps BLOB)'
+            )
+            self.db.commit()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return value
+            if self.db is not None:
+                row = self.db.execute(
+                    'SELECT solution, steps FROM solutions WHERE key = ?', (key,)
+                ).fetchone()
+                if row is not None:
+                    value = (row[0], bytes(row[1]))
+                    self._remember(key, value)
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def put(self, key, solution, steps):
+        """
+        Caches a result. Returns False (and caches nothing) if the step log is over max_entry_bytes.
+        """
+        if len(steps) > self.max_entry_bytes:
+            return False
+        with self.lock:
+            self._remember(key, (solution, steps))
+            if self.db is not None:
+                self.db.execute(
+                    'INSERT OR REPLACE INTO solutions (key, solution, steps) VALUES (?, ?, ?)',
+                    (key, solution, steps)
+                )
+                self.db.commit()
+        return True
+
+    def _remember(self, key, value):
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.total_bytes -= len(old[1])
+        self.entries[key] = value
+        self.total_bytes += len(value[1])
+        while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.total_bytes -= len(evicted[1])
+
+    def stats(self):
+        return {'entries': len(self.entries), 'bytes': self.total_bytes, 'hits': self.hits, 'misses': self.misses}
+
+
+def solve_with_cache(board, cache, solver='backtrack', timeout=None, max_nodes=None):
+    """
+    Cached version of solve_and_record_steps(compact=True). The board is solved
+    in its canonical form and the result, steps included, is mapped back
+    through the inverse transform, so equivalent puzzles share one entry.
+    Aborted searches are not cached. Boards of other sizes than 9x9 are solved uncached.
+    """
+    if len(board) != 9:
+        return solve_and_record_steps(board, solver=solver, compact=True, timeout=timeout, max_nodes=max_nodes)
+    if not is_board_valid(board):
+        return False, array('H'), board
+
+    key, transform = canonical_form(board)
+    cache_key = f'{solver}:{key}'
+    cached = cache.get(cache_key)
+    if cached is None:
+        canon = [[int(ch) for ch in key[r * 9:r * 9 + 9]] for r in range(9)]
+        success, steps, canon = solve_and_record_steps(
+            canon, solver=solver, compact=True, timeout=timeout, max_nodes=max_nodes
+        )
+        if isinstance(success, SolveAborted):
+            return success, array('H'), board
+        # The steps of an unsolvable search are never replayed, so only the verdict is kept
+        cached = (format_puzzle(canon), encode_steps(steps)) if success else ('', b'')
+        cache.put(cache_key, *cached)
+
+    solution, step_bytes = cached
+    if not solution:
+        return False, array('H'), board
+    final_board, steps = _map_back(transform, solution, decode_steps(step_bytes))
+    for r in range(9):
+        board[r][:] = final_board[r]
+    return True, steps, board
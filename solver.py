@@ -1,88 +1,776 @@
-BOX_SIZE = 3
+import math
+import sys
+import time
+from array import array
+
+BOX_SIZE = 3  # standard board; the engines also take any N x N board with N = box * box
+SUPPORTED_SIZES = (4, 9, 16, 25)
+
+
+def board_size(board):
+    """
+    Side length N of a square board made of sqrt(N) x sqrt(N) boxes (4, 9, 16, 25).
+    Raises ValueError for any other shape, or for cells that are not ints (JSON strings,
+    nulls, floats and booleans).
+    """
+    size = len(board)
+    if size not in SUPPORTED_SIZES or any(len(row) != size for row in board):
+        raise ValueError(f"Grid must be NxN with N one of {', '.join(map(str, SUPPORTED_SIZES))}")
+    if any(type(n) is not int for row in board for n in row):
+        raise ValueError("Grid cells must be integers")
+    return size
+
 
 def is_board_valid(board):
+    """
+    True if the board has a supported shape, values in 0..N and no duplicates in any unit.
+    """
+    try:
+        size = board_size(board)
+    except (TypeError, ValueError):
+        return False
+    box_size = math.isqrt(size)
+
     def has_duplicates(unit):
         nums = [n for n in unit if n != 0]
         return len(nums) != len(set(nums))
-    
+
+    # Check values
+    if any(not 0 <= n <= size for row in board for n in row):
+        return False
+
     # Check rows
     for row in board:
         if has_duplicates(row):
             return False
-        
+
     # Check columns
     for col in zip(*board):
         if has_duplicates(col):
             return False
-        
-    # Check BOX_SIZExBOX_SIZE boxes
-    for box_row in range(0, 9, BOX_SIZE):
-        for box_col in range(0, 9, BOX_SIZE):
-            box = [board[r][c] for r in range(box_row, box_row + BOX_SIZE) for c in range(box_col, box_col + BOX_SIZE)]
+
+    # Check box_size x box_size boxes
+    for box_row in range(0, size, box_size):
+        for box_col in range(0, size, box_size):
+            box = [board[r][c] for r in range(box_row, box_row + box_size) for c in range(box_col, box_col + box_size)]
             if has_duplicates(box):
                 return False
     return True
 
 def is_valid(board, row, col, num):
+    size = len(board)
+    box_size = math.isqrt(size)
     if num in board[row]:
         return False
-    for i in range(9):
+    for i in range(size):
         if board[i][col] == num:
             return False
-    box_start_row = row - row % BOX_SIZE
-    box_start_col = col - col % BOX_SIZE
-    for i in range(BOX_SIZE):
-        for j in range(BOX_SIZE):
+    box_start_row = row - row % box_size
+    box_start_col = col - col % box_size
+    for i in range(box_size):
+        for j in range(box_size):
             if board[box_start_row + i][box_start_col + j] == num:
                 return False
     return True
 
-def solve_sudoku(board):
+# Bitmask engine
+# Each digit d is stored as bit (d - 1), so a set of candidates for a cell is a
+# single int and row/column/box occupancy checks become one OR + AND.
+
+
+class _Geometry:
+    """
+    Index tables of an N x N board, built once per size: row, column and box of
+    every flat cell index, and the cells of every unit (rows, then columns, then boxes).
+    """
+
+    def __init__(self, size):
+        box = math.isqrt(size)
+        self.size = size
+        self.box = box
+        self.cells = size * size
+        self.all_digits = (1 << size) - 1
+        self.row_of = [i // size for i in range(self.cells)]
+        self.col_of = [i % size for i in range(self.cells)]
+        self.box_of = [(i // size) // box * box + (i % size) // box for i in range(self.cells)]
+        # Occupancy slots of each cell in _BitGrid.used: its row, column and box
+        self.cell_units = [
+            (self.row_of[i], size + self.col_of[i], 2 * size + self.box_of[i]) for i in range(self.cells)
+        ]
+        self.units = (
+            [[r * size + c for c in range(size)] for r in range(size)] +
+            [[r * size + c for r in range(size)] for c in range(size)] +
+            [[(br + r) * size + bc + c for r in range(box) for c in range(box)]
+             for br in range(0, size, box) for bc in range(0, size, box)]
+        )
+
+
+_geometries = {}
+
+
+def _geometry(size):
+    geometry = _geometries.get(size)
+    if geometry is None:
+        geometry = _geometries[size] = _Geometry(size)
+    return geometry
+
+
+# Cell -> row / column of the standard 9x9 board, for solve_cache.py's 9x9 transforms
+_STANDARD = _geometry(BOX_SIZE * BOX_SIZE)
+ROW_OF = _STANDARD.row_of
+COL_OF = _STANDARD.col_of
+
+
+class _BitGrid:
+    """
+    Flat N*N-cell grid with row, column and box occupancy kept as bitmasks.
+    Every placement is pushed onto a trail so the search can undo back to any
+    earlier point without copying the grid.
+    """
+
+    def __init__(self, board, on_step=None):
+        geometry = _geometry(len(board))
+        self.size = geometry.size
+        self.all_digits = geometry.all_digits
+        self.cell_units = geometry.cell_units
+        self.units = geometry.units
+        self.cells = [0] * geometry.cells
+        self.used = [0] * (3 * geometry.size)  # occupancy of each row, then column, then box
+        self.trail = []
+        self.on_step = on_step
+        size = self.size
+        for r in range(size):
+            for c in range(size):
+                if board[r][c]:
+                    self._set(r * size + c, 1 << (board[r][c] - 1))
+        self.trail = []  # givens are never undone
+
+    def _set(self, cell, bit):
+        self.cells[cell] = bit
+        r, c, b = self.cell_units[cell]
+        used = self.used
+        used[r] |= bit
+        used[c] |= bit
+        used[b] |= bit
+        self.trail.append(cell)
+
+    def candidates(self, cell):
+        r, c, b = self.cell_units[cell]
+        used = self.used
+        return self.all_digits & ~(used[r] | used[c] | used[b])
+
+    def place(self, cell, bit):
+        self._set(cell, bit)
+        if self.on_step:
+            self.on_step(cell, bit.bit_length())
+
+    def undo_to(self, mark):
+        trail, cells, used, cell_units = self.trail, self.cells, self.used, self.cell_units
+        while len(trail) > mark:
+            cell = trail.pop()
+            clear = ~cells[cell]
+            cells[cell] = 0
+            r, c, b = cell_units[cell]
+            used[r] &= clear
+            used[c] &= clear
+            used[b] &= clear
+            if self.on_step:
+                self.on_step(cell, 0)
+
+    def propagate(self):
+        """
+        Apply naked and hidden singles until nothing changes.
+        Returns False as soon as a cell or a unit runs out of options.
+        """
+        # Candidates are computed inline from the shared occupancy list; place() updates it in place
+        cells, used, cell_units, full = self.cells, self.used, self.cell_units, self.all_digits
+        changed = True
+        while changed:
+            changed = False
+
+            # Naked singles: a cell with exactly one candidate
+            for cell in range(len(cells)):
+                if cells[cell]:
+                    continue
+                r, c, b = cell_units[cell]
+                cands = full & ~(used[r] | used[c] | used[b])
+                if not cands:
+                    return False
+                if not cands & (cands - 1):
+                    self.place(cell, cands)
+                    changed = True
+
+            # Hidden singles: a digit with exactly one home in a unit
+            for unit in self.units:
+                once = twice = placed = 0
+                for cell in unit:
+                    if cells[cell]:
+                        placed |= cells[cell]
+                        continue
+                    r, c, b = cell_units[cell]
+                    cands = full & ~(used[r] | used[c] | used[b])
+                    twice |= once & cands
+                    once |= cands
+                if (once | placed) != full:
+                    return False
+                singles = once & ~twice & ~placed
+                while singles:
+                    bit = singles & -singles
+                    singles ^= bit
+                    for cell in unit:
+                        if not cells[cell] and self.candidates(cell) & bit:
+                            self.place(cell, bit)
+                            changed = True
+                            break
+                    else:
+                        return False  # its only home was taken by another single
+        return True
+
+    def pick_cell(self):
+        """
+        Minimum remaining values: returns (cell, candidates) for the empty cell
+        with the fewest options, or (-1, 0) when the grid is full.
+        """
+        cells, used, cell_units, full = self.cells, self.used, self.cell_units, self.all_digits
+        best, best_cands, best_count = -1, 0, self.size + 1
+        for cell in range(len(cells)):
+            if cells[cell]:
+                continue
+            r, c, b = cell_units[cell]
+            cands = full & ~(used[r] | used[c] | used[b])
+            count = bin(cands).count('1')
+            if count < best_count:
+                best, best_cands, best_count = cell, cands, count
+                if count <= 2:
+                    break
+        return best, best_cands
+
+
+
+def _search_nodes(grid):
+    """
+    Iterative depth-first search over the bit grid, guessing on the MRV cell and
+    propagating singles after every guess. Yields once per search node: False
+    after each guess, True each time the grid is completely filled. Resuming
+    after True backtracks towards the next solution.
+    """
+    if not grid.propagate():
+        return
+
+    stack = []  # frames of [cell, untried candidates, trail mark]
+    while True:
+        cell, cands = grid.pick_cell()
+        if cell == -1:
+            yield True
+        else:
+            stack.append([cell, cands, len(grid.trail)])
+
+        # Try the next candidate of the innermost frame, backtracking as needed
+        while stack:
+            frame = stack[-1]
+            grid.undo_to(frame[2])
+            if not frame[1]:
+                stack.pop()
+                continue
+            bit = frame[1] & -frame[1]
+            frame[1] ^= bit
+            grid.place(frame[0], bit)
+            yield False
+            if grid.propagate():
+                break
+        else:
+            return
+
+
+def count_solutions(board, limit=2, timeout=None, max_nodes=None, budget=None):
+    """
+    Counts the solutions of the board, stopping as soon as `limit` are found.
+    Returns 0 for invalid or unsolvable boards, so `count_solutions(b) == 1`
+    means the puzzle is uniquely solvable.
+    `timeout` (seconds) and `max_nodes` bound the search like in solve_sudoku, or
+    pass a SearchBudget to share one across several counts; when it runs out a
+    falsy SolveAborted is returned instead of the count.
+    """
+    if not is_board_valid(board):
+        return 0
+
+    if budget is None:
+        budget = SearchBudget(timeout, max_nodes)
+    count = 0
+    for solved in _search_nodes(_BitGrid(board)):
+        if solved:
+            count += 1
+            if count >= limit:
+                break
+        else:
+            aborted = budget.spend()
+            if aborted is not None:
+                return aborted
+    return count
+
+
+# Dancing Links (Algorithm X)
+# Exact cover over 4 * N*N constraint columns (cell filled, row/col/box has digit)
+# and N*N*N candidate rows (cell, digit). Nodes live in parallel int lists
+# instead of one Python object per node; index 0 is the root header and
+# 1..4*N*N are column headers. One template is built per board size.
+_dlx_templates = {}
+
+
+def _dlx_row_columns(geometry, cell, d):
+    size, cells = geometry.size, geometry.cells
+    r, c, b = geometry.row_of[cell], geometry.col_of[cell], geometry.box_of[cell]
+    return (1 + cell, 1 + cells + r * size + d, 1 + 2 * cells + c * size + d, 1 + 3 * cells + b * size + d)
+
+
+def _build_dlx_template(geometry):
+    n = 4 * geometry.cells + 1
+    left = [i - 1 for i in range(n)]
+    right = [i + 1 for i in range(n)]
+    left[0], right[n - 1] = n - 1, 0
+    up = list(range(n))
+    down = list(range(n))
+    col = list(range(n))
+    row_id = [-1] * n
+    size = [0] * n
+
+    for cell in range(geometry.cells):
+        for d in range(geometry.size):
+            first = len(col)
+            for c in _dlx_row_columns(geometry, cell, d):
+                node = len(col)
+                # Append to the bottom of column c
+                up.append(up[c])
+                down.append(c)
+                down[up[c]] = node
+                up[c] = node
+                col.append(c)
+                row_id.append(cell * geometry.size + d)
+                size[c] += 1
+                left.append(node - 1 if node > first else first + 3)
+                right.append(node + 1 if node < first + 3 else first)
+    return left, right, up, down, col, row_id, size
+
+
+class _DLX:
+    def __init__(self, geometry):
+        template = _dlx_templates.get(geometry.size)
+        if template is None:
+            template = _dlx_templates[geometry.size] = _build_dlx_template(geometry)
+        self.max_size = geometry.size + 1
+        self.L, self.R, self.U, self.D, self.C, self.row_id, self.S = (
+            list(a) for a in template)
+
+    def cover(self, c):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        R[L[c]] = R[c]
+        L[R[c]] = L[c]
+        i = D[c]
+        while i != c:
+            j = R[i]
+            while j != i:
+                D[U[j]] = D[j]
+                U[D[j]] = U[j]
+                S[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    def uncover(self, c):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        i = U[c]
+        while i != c:
+            j = L[i]
+            while j != i:
+                S[C[j]] += 1
+                D[U[j]] = j
+                U[D[j]] = j
+                j = L[j]
+            i = U[i]
+        R[L[c]] = c
+        L[R[c]] = c
+
+    def select(self, node):
+        j = self.R[node]
+        while j != node:
+            self.cover(self.C[j])
+            j = self.R[j]
+
+    def deselect(self, node):
+        j = self.L[node]
+        while j != node:
+            self.uncover(self.C[j])
+            j = self.L[j]
+
+    def choose_column(self):
+        R, S = self.R, self.S
+        best, best_size = 0, self.max_size
+        c = R[0]
+        while c != 0:
+            if S[c] < best_size:
+                best, best_size = c, S[c]
+                if best_size <= 1:
+                    break
+            c = R[c]
+        return best
+
+
+def _solve_dlx(board, on_step=None):
+    """
+    Exact-cover search with Knuth's Dancing Links. Givens are covered up
+    front; each chosen row is reported through on_step as a placement.
+    Engine generator (see SOLVERS): yields once per chosen row and returns
+    the N*N solved values, or None if there is no solution.
+    """
+    geometry = _geometry(len(board))
+    size = geometry.size
+    dlx = _DLX(geometry)
+    values = [0] * geometry.cells
+    for r in range(size):
+        for c in range(size):
+            if board[r][c]:
+                cell = r * size + c
+                values[cell] = board[r][c]
+                for col in _dlx_row_columns(geometry, cell, board[r][c] - 1):
+                    dlx.cover(col)
+
+    D, C, R, row_id = dlx.D, dlx.C, dlx.R, dlx.row_id
+    stack = []  # selected row node for each level
+    while True:
+        if R[0] == 0:
+            return values
+
+        c = dlx.choose_column()
+        dlx.cover(c)
+        node = D[c]
+
+        # Walk down to the next untried row, backtracking when a column runs dry
+        while True:
+            if node != C[node]:
+                dlx.select(node)
+                cell, d = divmod(row_id[node], size)
+                values[cell] = d + 1
+                if on_step:
+                    on_step(cell, d + 1)
+                stack.append(node)
+                yield
+                break
+            dlx.uncover(C[node])
+            if not stack:
+                return None
+            node = stack.pop()
+            dlx.deselect(node)
+            cell = row_id[node] // size
+            values[cell] = 0
+            if on_step:
+                on_step(cell, 0)
+            node = D[node]
+
+
+def _solve_backtrack(board, on_step=None):
+    """
+    Bitmask propagation search. Engine generator (see SOLVERS): yields once
+    per guess and returns the N*N solved values, or None.
+    """
+    grid = _BitGrid(board, on_step)
+    for solved in _search_nodes(grid):
+        if solved:
+            return [bit.bit_length() for bit in grid.cells]
+        yield
+    return None
+
+
+# Engines are generators that yield once per search node and return the N*N
+# solved values (or None), so callers can interleave work between nodes.
+SOLVERS = {
+    'backtrack': _solve_backtrack,
+    'dlx': _solve_dlx,
+}
+
+
+def _get_solver(name):
+    if name not in SOLVERS:
+        raise ValueError(f"Unknown solver: {name}")
+    return SOLVERS[name]
+
+
+class SolveAborted:
+    """
+    Returned instead of False when a search runs out of its time or node
+    budget. It is falsy, so `if solve_sudoku(...)` keeps working, and carries
+    the search statistics: reason ('timeout' or 'max_nodes'), nodes, elapsed_ms.
+    """
+
+    def __init__(self, reason, nodes, elapsed_ms):
+        self.reason = reason
+        self.nodes = nodes
+        self.elapsed_ms = elapsed_ms
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return f"SolveAborted({self.reason!r}, nodes={self.nodes}, elapsed_ms={self.elapsed_ms:.1f})"
+
+    def to_dict(self):
+        return {'reason': self.reason, 'nodes': self.nodes, 'elapsedMs': round(self.elapsed_ms, 1)}
+
+
+class SearchBudget:
+    """
+    Wall-clock time limit (seconds) and search node budget for one solve, or for
+    several counts sharing it (see count_solutions). Either may be None for no limit.
+    """
+
+    def __init__(self, timeout=None, max_nodes=None):
+        self.start = time.monotonic()
+        self.deadline = None if timeout is None else self.start + timeout
+        self.max_nodes = max_nodes
+        self.nodes = 0
+
+    def spend(self):
+        """
+        Counts one search node. Returns a SolveAborted once the budget is
+        exhausted, otherwise None.
+        """
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            return self.aborted('max_nodes')
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            return self.aborted('timeout')
+        return None
+
+    def aborted(self, reason):
+        return SolveAborted(reason, self.nodes, (time.monotonic() - self.start) * 1000)
+
+
+# Optional hook called as search_observer(solver, outcome, nodes, elapsed_ms, steps) after
+# every search; app.py points it at metrics.observe_search. steps is None when not recorded.
+search_observer = None
+
+
+def _observe(solver, budget, values, steps=None):
+    if search_observer is not None:
+        if isinstance(values, SolveAborted):
+            outcome = 'aborted'
+        else:
+            outcome = 'solved' if values is not None else 'unsolvable'
+        search_observer(solver, outcome, budget.nodes, (time.monotonic() - budget.start) * 1000, steps)
+
+
+def _run(search, budget=None):
+    """
+    Drives an engine generator to completion and returns its result, or a
+    SolveAborted if the budget runs out first.
+    """
+    try:
+        while True:
+            next(search)
+            if budget is not None:
+                aborted = budget.spend()
+                if aborted is not None:
+                    search.close()
+                    return aborted
+    except StopIteration as stop:
+        return stop.value
+
+
+def _write_back(board, values):
+    size = len(board)
+    for cell in range(size * size):
+        board[cell // size][cell % size] = values[cell]
+
+
+def solve_sudoku(board, solver='backtrack', timeout=None, max_nodes=None):
+    """
+    Solves the board (any supported size, see board_size) in place. Returns True on
+    success and False if the board is invalid or unsolvable. With a `timeout` (seconds) or `max_nodes` budget,
+    returns a falsy SolveAborted when the budget runs out.
+    """
     if not is_board_valid(board):
         return False  # Reject invalid puzzles immediately
 
-    for row in range(9):
-        for col in range(9):
-            if board[row][col] == 0:
-                for num in range(1, 10):
-                    if is_valid(board, row, col, num):
-                        board[row][col] = num
-                        if solve_sudoku(board):
-                            return True
-                        board[row][col] = 0
-                return False
+    budget = SearchBudget(timeout, max_nodes)
+    values = _run(_get_solver(solver)(board), budget)
+    _observe(solver, budget, values)
+    if isinstance(values, SolveAborted):
+        return values
+    if values is None:
+        return False
+    _write_back(board, values)
     return True
 
 
-def solve_and_record_steps(board):
+# Packed steps: one uint16 per step, cell index in the high bits and the
+# value (0 = removal) in the low 4 bits, or 5 bits for 16x16 and 25x25 boards.
+STEP_VALUE_BITS = 4
+
+
+def step_value_bits(size=9):
+    return STEP_VALUE_BITS if size < 1 << STEP_VALUE_BITS else STEP_VALUE_BITS + 1
+
+
+def pack_step(cell, value, size=9):
+    return cell << step_value_bits(size) | value
+
+
+def unpack_step(code, size=9):
+    """
+    Returns (row, col, value) for a packed step of a size x size board.
+    """
+    bits = step_value_bits(size)
+    cell, value = code >> bits, code & ((1 << bits) - 1)
+    return cell // size, cell % size, value
+
+
+def encode_steps(steps):
+    """
+    Serializes a packed step array as little-endian uint16 bytes.
+    """
+    if sys.byteorder == 'big':
+        steps = array('H', steps)
+        steps.byteswap()
+    return steps.tobytes()
+
+
+def decode_steps(data):
+    """
+    Inverse of encode_steps: little-endian uint16 bytes back to a packed step array.
+    """
+    steps = array('H', data)
+    if sys.byteorder == 'big':
+        steps.byteswap()
+    return steps
+
+
+def solve_and_record_steps(board, solver='backtrack', compact=False, timeout=None, max_nodes=None):
     """
     Solves the board and records each placement and removal as a step.
     Each step is a dictionary: {'row': r, 'col': c, 'value': v}
+    With compact=True the steps are an array('H') of packed steps instead
+    (see pack_step, with the value bits of the board's size), which is roughly
+    100x smaller than the list of dicts.
+    `solver` picks the engine: 'backtrack' (default) or 'dlx'.
+    `timeout` (seconds) and `max_nodes` bound the search; when either runs out
+    the success flag is a falsy SolveAborted with the search statistics.
     """
+    engine = _get_solver(solver)
+    steps = array('H') if compact else []
     if not is_board_valid(board):
-        return False, [], board  # Reject early with empty steps
-    
-    steps = []
-
-    def backtrack():
-        for row in range(9):
-            for col in range(9):
-                if board[row][col] == 0:
-                    for num in range(1, 10):
-                        if is_valid(board, row, col, num):
-                            board[row][col] = num
-                            steps.append({'row': row, 'col': col, 'value': num})
-
-                            if backtrack():
-                                return True
-
-                            board[row][col] = 0
-                            steps.append({'row': row, 'col': col, 'value': 0})
-                    return False
-        return True
+        return False, steps, board  # Reject early with empty steps
+
+    size = len(board)
+    if compact:
+        append = steps.append
+        bits = step_value_bits(size)
+
+        def record(cell, value):
+            append(cell << bits | value)
+    else:
+        def record(cell, value):
+            steps.append({'row': cell // size, 'col': cell % size, 'value': value})
+
+    budget = SearchBudget(timeout, max_nodes)
+    values = _run(engine(board, on_step=record), budget)
+    _observe(solver, budget, values, len(steps))
+    if isinstance(values, SolveAborted):
+        return values, steps, board
+    if values is None:
+        return False, steps, board
+    _write_back(board, values)
+    return True, steps, board
+
+
+def iter_solve_steps(board, solver='backtrack', batch_size=64, timeout=None, max_nodes=None):
+    """
+    Streaming form of solve_and_record_steps(compact=True): a generator that
+    yields array('H') batches of packed steps while the search runs, so steps
+    are never all held in memory. The generator's return value is the success
+    flag (a SolveAborted if the `timeout`/`max_nodes` budget runs out), and on
+    success the board is filled in place. Closing the generator stops the search.
+    """
+    engine = _get_solver(solver)
+    if not is_board_valid(board):
+        return False
+
+    batch = array('H')
+    bits = step_value_bits(len(board))
+
+    def record(cell, value):
+        batch.append(cell << bits | value)
+
+    budget = SearchBudget(timeout, max_nodes)
+    search = engine(board, on_step=record)
+    streamed = 0
+    try:
+        while True:
+            next(search)
+            values = budget.spend()
+            if values is not None:
+                search.close()
+                break
+            if len(batch) >= batch_size:
+                streamed += len(batch)
+                yield batch
+                batch = array('H')
+    except StopIteration as stop:
+        values = stop.value
+
+    _observe(solver, budget, values, streamed + len(batch))
+    if batch:
+        yield batch
+    if isinstance(values, SolveAborted):
+        return values
+    if values is None:
+        return False
+    _write_back(board, values)
+    return True
+
+
+def parse_puzzle(puzzle):
+    """
+    Parses an 81-character puzzle string (row by row, '0' or '.' for blanks)
+    into a 9x9 board.
+    """
+    puzzle = puzzle.strip()
+    if len(puzzle) != 81:
+        raise ValueError("Puzzle string must have 81 characters")
+    values = [0 if ch == '.' else int(ch) for ch in puzzle]
+    return [values[r * 9:r * 9 + 9] for r in range(9)]
+
+
+def format_puzzle(board):
+    """
+    Formats a 9x9 board as an 81-character string with '0' for blanks.
+    """
+    return ''.join(str(num) for row in board for num in row)
+
+
+def solve_puzzle(puzzle, solver='backtrack', timeout=None, max_nodes=None):
+    """
+    Solves one puzzle given as an 81-character string or a 9x9 list.
+    Used as the worker function for batch solving, so it never raises:
+    returns {'success': bool, 'solution': str or None} plus 'error' on bad input
+    and 'aborted' (search statistics) when the budget runs out.
+    """
+    try:
+        if isinstance(puzzle, str):
+            board = parse_puzzle(puzzle)
+        else:
+            board = [list(map(int, row)) for row in puzzle]
+            if len(board) != 9 or any(len(row) != 9 for row in board):
+                raise ValueError("Grid must be 9x9")
+        if any(not 0 <= num <= 9 for row in board for num in row):
+            raise ValueError("Values must be between 0 and 9")
+    except (TypeError, ValueError) as e:
+        return {'success': False, 'solution': None, 'error': str(e)}
+
+    result = solve_sudoku(board, solver=solver, timeout=timeout, max_nodes=max_nodes)
+    if isinstance(result, SolveAborted):
+        return {'success': False, 'solution': None, 'aborted': result.to_dict()}
+    if not result:
+        return {'success': False, 'solution': None}
+    return {'success': True, 'solution': format_puzzle(board)}
 
-    success = backtrack()
-    return success, steps, board
 
 def print_board(board):
     for row in board:
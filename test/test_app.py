@@ -0,0 +1,246 @@
+import sys
+import os
+import io
+import json
+import base64
+from concurrent.futures.process import BrokenProcessPool
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import cv2
+import numpy as np
+import pytest
+import app as app_module
+import vision.OCR
+from image_cache import ImageResultCache
+from solver import unpack_step
+
+IMAGES = os.path.join(os.path.dirname(__file__), 'Images')
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+def read_image(name):
+    with open(os.path.join(IMAGES, name), 'rb') as f:
+        return f.read()
+
+
+def test_scan_does_not_cache_failed_ocr(client, monkeypatch):
+    def broken_model(batch):
+        raise RuntimeError("model not loaded")
+
+    monkeypatch.setattr(vision.OCR, 'predict_digits', broken_model)
+    data = read_image('testImage1.jpg')
+    entries = app_module.image_cache.stats()['entries']
+
+    response = client.post('/scan', data=data, content_type='application/octet-stream')
+    assert response.status_code == 500
+    assert 'model not loaded' in response.json['error']
+    assert app_module.image_cache.stats()['entries'] == entries
+
+
+def upload(client, name):
+    data = {'image': (io.BytesIO(read_image(name)), name)}
+    return client.post('/upload', data=data, content_type='multipart/form-data').json['session_id']
+
+
+def test_detect_grid_rejects_bad_max_side(client):
+    sid = upload(client, 'testImage1.jpg')
+    for max_side in ('abc', '-5', '10'):
+        response = client.post('/detect_grid', data={'session_id': sid, 'maxSide': max_side})
+        assert response.status_code == 400 and 'maxSide' in response.json['error']
+    assert client.post('/detect_grid', data={'session_id': sid, 'maxSide': '0'}).status_code == 200
+
+
+def test_dropped_warped_board_is_rebuilt(client, monkeypatch):
+    sid = upload(client, 'testImage1.jpg')
+    assert client.post('/detect_grid', data={'session_id': sid}).status_code == 200
+    warped = app_module.session_store.get(sid, 'warped_board')
+
+    # Room for two uploads only: the next one sheds this session's derived images
+    image_bytes = app_module.session_store.get(sid, 'uploaded_image').nbytes
+    monkeypatch.setattr(app_module.session_store, 'max_bytes', 2 * image_bytes + 1024)
+    upload(client, 'testImage1.jpg')
+    assert app_module.session_store.sessions[sid]['images'].keys() == {'uploaded_image'}
+
+    response = client.get(f'/sessions/{sid}/warped_board.png')
+    assert response.status_code == 200
+    assert np.array_equal(app_module.session_store.get(sid, 'warped_board'), warped)
+
+
+PUZZLE = '530070000600195000098000060800060003400803001700020006060000280000419005000080079'
+HARD_PUZZLE = '000000010400000000020000000000050407008000300001090000300400200050100000000806000'
+EMPTY = '0' * 81  # needs guessing, so a tiny node budget aborts it
+
+
+def grid(puzzle):
+    return [[int(ch) for ch in puzzle[r * 9:r * 9 + 9]] for r in range(9)]
+
+
+def blank_model(batch):
+    return np.eye(10, dtype=np.float32)[np.zeros(len(batch), dtype=int)]  # every cell read as blank
+
+
+def test_scan_success_then_cached(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'image_cache', ImageResultCache())
+    monkeypatch.setattr(vision.OCR, 'predict_digits', blank_model)
+    data = read_image('testImage1.jpg')
+
+    result = client.post('/scan', data=data, content_type='application/octet-stream').json
+    assert not result['cached'] and len(result['corners']) == 4
+    assert result['board'] == [[0] * 9 for _ in range(9)]
+    assert result['success'] and len(result['solution']) == 9
+    assert {'decode', 'fingerprint', 'ocr'} <= result['timings'].keys()
+
+    response = client.post('/scan', data={'image': (io.BytesIO(data), 'board.jpg'), 'session': 'true'},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200 and response.json['cached']
+    assert client.get(f"/sessions/{response.json['session_id']}/warped_board.png").status_code == 200
+
+
+def test_scan_errors(client):
+    assert client.post('/scan', data=b'', content_type='application/octet-stream').status_code == 400
+    assert client.post('/scan', data=b'not an image', content_type='application/octet-stream').status_code == 400
+    response = client.post('/scan?solver=nope', data=read_image('testImage2.jpg'), content_type='application/octet-stream')
+    assert response.status_code == 400
+
+    _, blank = cv2.imencode('.png', np.full((200, 200, 3), 255, dtype=np.uint8))
+    response = client.post('/scan', data=blank.tobytes(), content_type='application/octet-stream')
+    assert response.status_code == 422 and 'Detection failed' in response.json['error']
+
+
+def test_validate(client, monkeypatch):
+    assert client.post('/validate', json={'grid': grid(PUZZLE)}).json == {
+        'valid': True, 'solutions': 1, 'unique': True, 'limitReached': False
+    }
+    ambiguous = client.post('/validate', json={'grid': grid(EMPTY), 'limit': 3}).json
+    assert ambiguous['solutions'] == 3 and not ambiguous['unique'] and ambiguous['limitReached']
+    duplicate = grid(PUZZLE)
+    duplicate[0][2] = 5
+    assert client.post('/validate', json={'grid': duplicate}).json['valid'] is False
+
+    assert client.post('/validate', json={}).status_code == 400
+    assert client.post('/validate', json={'grid': grid(PUZZLE), 'limit': 0}).status_code == 400
+
+    monkeypatch.setattr(app_module, 'SOLVE_MAX_NODES', 1)
+    response = client.post('/validate', json={'grid': grid(EMPTY)})
+    assert response.status_code == 422 and response.json['aborted']['reason'] == 'max_nodes'
+
+
+def test_packed_solve_replays_to_final_board(client, monkeypatch):
+    result = client.post('/solve', json={'grid': grid(HARD_PUZZLE), 'solver': 'dlx'}).json
+    assert result['success'] and result['stepFormat'] == 'packed' and result['stepValueBits'] == 4
+    codes = np.frombuffer(base64.b64decode(result['steps']), dtype='<u2')
+    assert len(codes) == result['stepCount']
+    board = grid(HARD_PUZZLE)
+    for code in codes:
+        row, col, value = unpack_step(int(code))
+        board[row][col] = value
+    assert board == result['finalBoard']
+
+    listed = client.post('/solve', json={'grid': grid(HARD_PUZZLE), 'solver': 'dlx', 'stepFormat': 'list'}).json
+    assert listed['steps'] == [dict(zip(('row', 'col', 'value'), unpack_step(int(code)))) for code in codes]
+
+    assert client.post('/solve', json={}).status_code == 400
+    assert client.post('/solve', json={'grid': grid(PUZZLE), 'solver': 'nope'}).status_code == 400
+    assert client.post('/solve', json={'grid': grid(PUZZLE), 'stepFormat': 'xml'}).status_code == 400
+    assert client.post('/solve', json={'grid': [[1, 2], [3]]}).status_code == 400
+    for bad in ('5', None, 1.5, True):
+        cells = grid(PUZZLE)
+        cells[0][2] = bad
+        response = client.post('/solve', json={'grid': cells})
+        assert response.status_code == 400 and 'integers' in response.json['error']
+        assert client.post('/validate', json={'grid': cells}).status_code == 400
+
+    monkeypatch.setattr(app_module, 'SOLVE_MAX_NODES', 1)
+    empty = [[0] * 4 for _ in range(4)]  # not 9x9, so not answered from the solve cache
+    response = client.post('/solve', json={'grid': empty})
+    assert response.status_code == 422 and response.json['aborted']['reason'] == 'max_nodes'
+
+
+def test_solve_batch(client, monkeypatch):
+    result = client.post('/solve_batch', json={'grids': [PUZZLE, grid(HARD_PUZZLE), '1' * 81], 'solver': 'dlx'}).json
+    assert result['count'] == 3 and result['solved'] == 2
+    assert [r['success'] for r in result['results']] == [True, True, False]
+    text = client.post('/solve_batch', data=f'{PUZZLE}\n\n{HARD_PUZZLE}\n', content_type='text/plain').json
+    assert text['solved'] == 2
+
+    assert client.post('/solve_batch', json=[]).status_code == 400
+    assert client.post('/solve_batch', json={'grids': [PUZZLE], 'solver': 'nope'}).status_code == 400
+    monkeypatch.setattr(app_module, 'MAX_BATCH_GRIDS', 1)
+    assert client.post('/solve_batch', json=[PUZZLE, PUZZLE]).status_code == 413
+
+
+class BrokenPool:
+    def __init__(self):
+        self.shut_down = False
+
+    def map(self, *args, **kwargs):
+        raise BrokenProcessPool("a worker died")
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+def test_solve_batch_replaces_a_broken_pool(client, monkeypatch):
+    broken = BrokenPool()
+    monkeypatch.setattr(app_module, '_solver_pool', broken)
+    result = client.post('/solve_batch', json=[PUZZLE]).json
+    assert result['solved'] == 1
+    assert broken.shut_down and app_module._solver_pool is not broken
+
+    # Still broken after the retry: 503 rather than a 500 on every later request
+    monkeypatch.setattr(app_module, 'get_solver_pool', BrokenPool)
+    assert client.post('/solve_batch', json=[PUZZLE]).status_code == 503
+
+
+def read_events(response):
+    events = []
+    for block in response.get_data(as_text=True).strip().split('\n\n'):
+        event, data = block.split('\n')
+        events.append((event[len('event: '):], data[len('data: '):]))
+    return events
+
+
+def test_solve_stream(client, monkeypatch):
+    response = client.get(f'/solve_stream?grid={HARD_PUZZLE}&solver=dlx')
+    assert response.mimetype == 'text/event-stream'
+    events = read_events(response)
+    assert {event for event, _ in events[:-1]} == {'steps'}
+    event, data = events[-1]
+    done = json.loads(data)
+    assert event == 'done' and done['success'] and 'aborted' not in done
+    assert done['finalBoard'] == client.post('/solve', json={'grid': grid(HARD_PUZZLE)}).json['finalBoard']
+
+    assert client.get('/solve_stream?grid=123').status_code == 400
+    assert client.get(f'/solve_stream?grid={PUZZLE}&solver=nope').status_code == 400
+
+    monkeypatch.setattr(app_module, 'SOLVE_MAX_NODES', 1)
+    done = json.loads(read_events(client.get(f'/solve_stream?grid={EMPTY}'))[-1][1])
+    assert not done['success'] and done['aborted']['reason'] == 'max_nodes'
+
+
+def test_too_large_requests_get_json_413(client, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'MAX_CONTENT_LENGTH', 1000)
+    response = client.post('/solve', json={'grid': [[0] * 9 for _ in range(9)], 'padding': 'x' * 2000})
+    assert response.status_code == 413 and response.json == {'error': 'Image too large'}
+
+    monkeypatch.setattr(app_module, 'MAX_IMAGE_BYTES', 1000)
+    data = {'image': (io.BytesIO(read_image('testImage2.jpg')), 'board.jpg')}
+    response = client.post('/upload', data=data, content_type='multipart/form-data')
+    assert response.status_code == 413 and response.is_json
+
+
+def test_metrics_and_stats(client):
+    client.post('/solve', json={'grid': grid(PUZZLE)})
+    response = client.get('/metrics')
+    assert response.status_code == 200 and response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert 'sudoku_requests_total{endpoint="solve",status="200"}' in text
+    assert '# TYPE sudoku_request_seconds histogram' in text
+
+    stats = client.get('/stats').json
+    assert stats.keys() == {'imageCache', 'ocrBatcher', 'solveCache', 'sessions'}
+    assert stats['solveCache']['entries'] >= 1 and 'sessions' in stats['sessions']
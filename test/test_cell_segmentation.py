@@ -1,20 +1,38 @@
 import sys
 import os
 import cv2
-import matplotlib.pyplot as plt
-from tkinter import Tk
-from tkinter.filedialog import askopenfilename
+import numpy as np
 
 # Add project root to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from vision.preprocessing import preprocess_image
+from vision.preprocessing import preprocess_image, split_cells
 from vision.grid_detection import find_sudoku_contour, get_perspective_transform
-from vision.cell_segmentation import split_cells
 
-def main():
-    Tk().withdraw()
-    image_path = askopenfilename(filetypes=[("Image Files", "*.jpg *.jpeg *.png *.bmp")])
+IMAGE_PATH = os.path.join(os.path.dirname(__file__), 'Images', 'testImage1.jpg')
+
+
+def test_split_cells_gives_81_views():
+    original, thresh = preprocess_image(IMAGE_PATH)
+    warped, _ = get_perspective_transform(original, find_sudoku_contour(thresh))
+    for mode in ('uniform', 'lines'):
+        cells = split_cells(warped, mode=mode)
+        assert len(cells) == 9 and all(len(row) == 9 for row in cells)
+        assert all(cell.size and np.shares_memory(cell, warped) for row in cells for cell in row)
+
+
+def main(image_path=None):
+    """
+    Plots the warped board and its 81 cells. Pass an image path, or pick one in a file dialog.
+    """
+    import matplotlib.pyplot as plt
+
+    if not image_path:
+        from tkinter import Tk
+        from tkinter.filedialog import askopenfilename
+
+        Tk().withdraw()
+        image_path = askopenfilename(filetypes=[("Image Files", "*.jpg *.jpeg *.png *.bmp")])
 
     if not image_path:
         print("No image selected.")
@@ -26,7 +44,7 @@ def main():
     try:
         # Step 2: Detect the grid and warp it
         contour = find_sudoku_contour(thresh)
-        warped = get_perspective_transform(original, contour)
+        warped, _ = get_perspective_transform(original, contour)
 
         # Step 3: Segment into 81 cells
         cells = split_cells(warped)
@@ -63,4 +81,4 @@ def main():
     plt.show()
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
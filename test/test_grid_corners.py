@@ -0,0 +1,64 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import cv2
+import numpy as np
+from vision.preprocessing import preprocess_image
+from vision.grid_detection import find_grid_corners, find_sudoku_contour, order_points
+
+IMAGE_PATH = os.path.join(os.path.dirname(__file__), 'Images', 'testImage3.jpg')
+
+
+def test_downscaled_detection_matches_full_resolution():
+    image = cv2.imread(IMAGE_PATH)
+    _, thresh = preprocess_image(image)
+    full = order_points(find_sudoku_contour(thresh).reshape(4, 2).astype("float32"))
+
+    corners, small_thresh, timings = find_grid_corners(image, max_side=1000)
+    assert max(small_thresh.shape) <= 1100
+    assert np.abs(order_points(corners) - full).max() < 8
+    assert set(timings) == {'preprocess', 'detect'}
+
+    # A cached threshold image is reused, and max_side=0 means full resolution
+    again, reused, _ = find_grid_corners(image, max_side=1000, thresh=small_thresh)
+    assert reused is small_thresh and np.allclose(again, corners)
+    _, full_thresh, _ = find_grid_corners(image, max_side=0)
+    assert full_thresh.shape == thresh.shape
+
+
+def test_line_aware_cells_are_views_between_grid_lines():
+    from vision.grid_detection import get_perspective_transform
+    from vision.preprocessing import split_cells, find_cell_bounds
+    from vision.OCR import find_digit_cells
+
+    image = cv2.imread(IMAGE_PATH)
+    warped, _ = get_perspective_transform(image, find_grid_corners(image)[0])
+    row_spans, col_spans = find_cell_bounds(warped)
+    assert len(row_spans) == len(col_spans) == 9
+    assert all(a[1] <= b[0] for a, b in zip(row_spans, row_spans[1:]))
+
+    cells = split_cells(warped, mode='lines')
+    assert all(np.shares_memory(cell, warped) for row in cells for cell in row)
+    assert cells[4][4].shape[:2] == (row_spans[4][1] - row_spans[4][0], col_spans[4][1] - col_spans[4][0])
+
+    uniform, _, _ = find_digit_cells(warped, segmentation='uniform')
+    lines, _, _ = find_digit_cells(warped, segmentation='lines')
+    assert np.array_equal(uniform, lines)
+
+
+def test_digit_cells_match_is_blank_under_uneven_lighting():
+    from vision.grid_detection import get_perspective_transform
+    from vision.preprocessing import split_cells
+    from vision.OCR import find_digit_cells, is_blank
+
+    image = cv2.imread(IMAGE_PATH)
+    warped, _ = get_perspective_transform(image, find_grid_corners(image)[0])
+    for strength in (0.0, 0.5, 0.85):
+        # Darken the board from left to right, down to (1 - strength) of its brightness
+        shading = 1 - strength * np.linspace(0, 1, warped.shape[1])[None, :, None]
+        shaded = (warped * shading).astype(np.uint8)
+        expected = np.array([[not is_blank(cell) for cell in row] for row in split_cells(shaded)])
+        has_digit, _, _ = find_digit_cells(shaded)
+        assert expected.sum() > 20
+        assert np.array_equal(has_digit, expected), strength
@@ -1,8 +1,6 @@
 import sys
 import os
 import cv2
-from tkinter import Tk
-from tkinter.filedialog import askopenfilename
 
 # Add root directory to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -10,10 +8,31 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from vision.preprocessing import preprocess_image
 from vision.grid_detection import find_sudoku_contour, get_perspective_transform
 
-def main():
-    Tk().withdraw()
-    print("Please select a Sudoku image...")
-    image_path = askopenfilename(filetypes=[("Image Files", "*.jpg *.jpeg *.png *.bmp")])
+IMAGES = os.path.join(os.path.dirname(__file__), 'Images')
+# Photos where the board outline is found automatically (the others need manual corners)
+DETECTABLE = ['testImage1.jpg', 'testImage3.jpg', 'testImage4.jpg', 'testImage5.jpg', 'testingImage7.jpg']
+
+
+def test_grid_is_detected_in_test_images():
+    for name in DETECTABLE:
+        original, thresh = preprocess_image(os.path.join(IMAGES, name))
+        warped, corners = get_perspective_transform(original, find_sudoku_contour(thresh))
+        assert corners.shape == (4, 2)
+        assert warped.shape[0] == warped.shape[1] > 200, name
+
+
+def main(image_path=None):
+    """
+    Shows the thresholded image, all 4-corner candidates and the warped grid.
+    Pass an image path, or pick one in a file dialog.
+    """
+    if not image_path:
+        from tkinter import Tk
+        from tkinter.filedialog import askopenfilename
+
+        Tk().withdraw()
+        print("Please select a Sudoku image...")
+        image_path = askopenfilename(filetypes=[("Image Files", "*.jpg *.jpeg *.png *.bmp")])
 
     if not image_path:
         print("No image selected. Exiting.")
@@ -31,7 +50,7 @@ def main():
 
     try:
         contour = find_sudoku_contour(thresh)
-        warped = get_perspective_transform(original, contour)
+        warped, _ = get_perspective_transform(original, contour)
         cv2.imshow("Warped Grid", warped)
     except Exception as e:
         print(f"[INFO] Sudoku grid not found: {e}")
@@ -46,4 +65,4 @@ def main():
     cv2.destroyAllWindows()
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,32 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import cv2
+from image_cache import ImageResultCache, image_fingerprint
+
+IMAGES = os.path.join(os.path.dirname(__file__), 'Images')
+
+
+def test_exact_and_near_identical_hits():
+    image = cv2.imread(os.path.join(IMAGES, 'testImage3.jpg'))
+    cache = ImageResultCache()
+    assert cache.get(image_fingerprint(image)) is None
+
+    corners = [[10, 20], [110, 20], [110, 120], [10, 120]]
+    board = [[0] * 9 for _ in range(9)]
+    board[0][0] = 5
+    cache.put(image_fingerprint(image), corners, board)
+    assert cache.get(image_fingerprint(image)) == {'corners': corners, 'board': board}
+
+    # A re-encoded, half-size copy hits the same entry with rescaled corners, but the
+    # board is only trusted for the exact image (OCR reruns on near hits)
+    small = cv2.resize(image, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA)
+    small = cv2.imdecode(cv2.imencode('.jpg', small, [cv2.IMWRITE_JPEG_QUALITY, 90])[1], cv2.IMREAD_COLOR)
+    hit = cache.get(image_fingerprint(small))
+    assert hit is not None and hit['corners'][1] == [55.0, 10.0]
+    assert hit['board'] is None
+
+    other = cv2.imread(os.path.join(IMAGES, 'testImage4.jpg'))
+    assert cache.get(image_fingerprint(other)) is None
+    assert cache.stats() == {'entries': 1, 'hits': 1, 'nearHits': 1, 'misses': 2}
@@ -0,0 +1,41 @@
+import sys
+import os
+import threading
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pytest
+from vision.inference import MicroBatcher
+
+
+def test_concurrent_requests_share_batches_and_get_their_own_rows():
+    calls = []
+
+    def predict(x):
+        calls.append(len(x))
+        return x.reshape(len(x), -1)[:, :2] * 2
+
+    batcher = MicroBatcher(predict, max_batch=64, max_wait_ms=20)
+    results = {}
+
+    def request(i):
+        results[i] = batcher.predict(np.full((i + 1, 28, 28, 1), i, dtype=np.float32))
+
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for i in range(8):
+        assert results[i].shape == (i + 1, 2) and np.all(results[i] == 2 * i)
+    assert sum(calls) == 36 and len(calls) < 8
+
+
+def test_errors_reach_every_caller():
+    def predict(x):
+        raise RuntimeError("model missing")
+
+    batcher = MicroBatcher(predict)
+    with pytest.raises(RuntimeError, match="model missing"):
+        batcher.predict(np.zeros((1, 28, 28, 1), dtype=np.float32))
@@ -0,0 +1,71 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+import solver
+from metrics import Metrics, registry, timed, observe_search, update_memory_gauges
+
+
+def test_render_prometheus_text():
+    metrics = Metrics()
+    metrics.describe('requests_total', 'counter', 'Requests.')
+    metrics.describe('latency_seconds', 'histogram', 'Latency.')
+    metrics.inc('requests_total', endpoint='scan', status=200)
+    metrics.inc('requests_total', endpoint='scan', status=200)
+    metrics.observe('latency_seconds', 0.003, buckets=(0.001, 0.01), endpoint='scan')
+    metrics.observe('latency_seconds', 0.5, buckets=(0.001, 0.01), endpoint='scan')
+
+    lines = metrics.render().splitlines()
+    assert '# TYPE requests_total counter' in lines
+    assert 'requests_total{endpoint="scan",status="200"} 2' in lines
+    assert 'latency_seconds_bucket{endpoint="scan",le="0.001"} 0' in lines
+    assert 'latency_seconds_bucket{endpoint="scan",le="0.01"} 1' in lines
+    assert 'latency_seconds_bucket{endpoint="scan",le="+Inf"} 2' in lines
+    assert 'latency_seconds_count{endpoint="scan"} 2' in lines
+
+
+def test_timed_records_latency_and_errors():
+    @timed('test_stage')
+    def stage(fail=False):
+        if fail:
+            raise ValueError("boom")
+        return 42
+
+    assert stage() == 42
+    with pytest.raises(ValueError):
+        stage(fail=True)
+
+    key = ('sudoku_stage_seconds', (('stage', 'test_stage'),))
+    assert registry.histograms[key][3] == 2
+    assert registry.values[('sudoku_stage_errors_total', (('stage', 'test_stage'),))] == 1
+
+
+def test_solver_observer_sees_every_search():
+    seen = []
+    solver.search_observer = lambda *args: seen.append(args)
+    try:
+        puzzle = solver.parse_puzzle(
+            '530070000600195000098000060800060003400803001700020006060000280000419005000080079'
+        )
+        assert solver.solve_sudoku([row[:] for row in puzzle], solver='dlx')
+        solver.solve_and_record_steps([row[:] for row in puzzle])
+    finally:
+        solver.search_observer = None
+
+    (name, outcome, nodes, _, steps), (_, _, _, _, recorded) = seen
+    assert (name, outcome, steps) == ('dlx', 'solved', None)
+    assert nodes > 0 and recorded > 0
+
+
+def test_observe_search_buckets_nodes():
+    observe_search('test_solver', 'aborted', 150, 12.0, steps=7)
+    assert registry.values[('sudoku_solves_total', (('outcome', 'aborted'), ('solver', 'test_solver')))] == 1
+    assert registry.histograms[('sudoku_solver_nodes', (('solver', 'test_solver'),))][3] == 1
+
+
+def test_memory_gauges_without_resource_module(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'resource', None)  # as on Windows: importing it fails
+    registry.values.pop(('process_peak_rss_bytes', ()), None)
+    update_memory_gauges()
+    assert ('process_peak_rss_bytes', ()) not in registry.values
@@ -0,0 +1,50 @@
+import sys
+import os
+import numpy as np
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from vision.numpy_model import conv2d_same, max_pool_2x2, NumpyDigitModel
+
+
+def naive_conv2d_same(x, w, b):
+    n, h, wd, c = x.shape
+    kh, kw, _, k = w.shape
+    xp = np.pad(x, ((0, 0), (kh // 2, kh // 2), (kw // 2, kw // 2), (0, 0)))
+    out = np.zeros((n, h, wd, k), dtype=np.float64)
+    for i in range(h):
+        for j in range(wd):
+            patch = xp[:, i:i + kh, j:j + kw, :]
+            out[:, i, j, :] = np.tensordot(patch, w, axes=([1, 2, 3], [0, 1, 2])) + b
+    return out
+
+
+def test_conv2d_same_matches_naive_convolution():
+    rng = np.random.default_rng(0)
+    x = rng.random((2, 7, 7, 3), dtype=np.float32)
+    w = rng.standard_normal((3, 3, 3, 4)).astype(np.float32)
+    b = rng.standard_normal(4).astype(np.float32)
+    assert np.allclose(conv2d_same(x, w, b), naive_conv2d_same(x, w, b), atol=1e-5)
+
+
+def test_max_pool_and_model_forward(tmp_path):
+    x = np.arange(16, dtype=np.float32).reshape(1, 4, 4, 1)
+    assert max_pool_2x2(x)[0, :, :, 0].tolist() == [[5, 7], [13, 15]]
+
+    # conv -> affine -> pool -> flatten -> dense(softmax)
+    rng = np.random.default_rng(1)
+    path = tmp_path / 'tiny.npz'
+    np.savez(
+        path,
+        layers=np.array(['conv', 'affine', 'pool', 'flatten', 'dense']),
+        activations=np.array(['relu', 'linear', 'linear', 'linear', 'softmax']),
+        **{
+            '0_w': rng.standard_normal((3, 3, 1, 2)), '0_b': np.zeros(2),
+            '1_w': np.array([2.0, -1.0]), '1_b': np.array([0.5, 0.0]),
+            '4_w': rng.standard_normal((2 * 2 * 2, 10)), '4_b': np.zeros(10),
+        }
+    )
+    probs = NumpyDigitModel(path).predict(rng.random((3, 4, 4, 1)))
+    assert probs.shape == (3, 10)
+    assert np.allclose(probs.sum(axis=1), 1.0)
@@ -0,0 +1,63 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from solver import count_solutions, is_board_valid
+from ocr_correction import correct_board, top_k_readings
+
+PUZZLE = "000000010400000000020000000000050407008000300001090000300400200050100000000806000"
+
+
+def confident_probs(board):
+    probs = np.zeros((9, 9, 10), dtype=np.float32)
+    for r in range(9):
+        for c in range(9):
+            if board[r][c]:
+                probs[r, c] = 0.01 / 9
+                probs[r, c, board[r][c]] = 0.99
+    return probs
+
+
+def misread(board, read, probs, r, c, wrong, p_wrong=0.6):
+    """Make the model prefer `wrong` at (r, c), with the true digit second."""
+    true = board[r][c]
+    probs[r, c] = 0.0
+    probs[r, c, wrong] = p_wrong
+    probs[r, c, true] = 1.0 - p_wrong - 0.05
+    probs[r, c, 0] = 0.05
+    read[r][c] = wrong
+
+
+def test_top_k_readings():
+    board = [[int(ch) for ch in PUZZLE[r * 9:r * 9 + 9]] for r in range(9)]
+    readings = top_k_readings(confident_probs(board), k=2)
+    assert readings[0][0] is None
+    assert readings[0][7][0] == [1, 0.9900000095367432]
+    assert len(readings[0][7]) == 2
+
+
+def test_misreads_are_corrected_to_the_unique_board():
+    board = [[int(ch) for ch in PUZZLE[r * 9:r * 9 + 9]] for r in range(9)]
+    assert count_solutions(board) == 1
+    probs = confident_probs(board)
+
+    # A 4 read as 7 duplicates the 7 in its row; a 3 read as 8 then also has to be undone
+    read = [row[:] for row in board]
+    misread(board, read, probs, 3, 6, 7)
+    misread(board, read, probs, 6, 0, 8)
+    assert not is_board_valid(read)
+
+    result = correct_board(read, probs)
+    assert result['unique'] and result['board'] == board
+    assert {(ch['row'], ch['col'], ch['to']) for ch in result['changes']} == {(3, 6, 4), (6, 0, 3)}
+
+    # Already unique boards come back unchanged after a single check
+    result = correct_board(board, confident_probs(board))
+    assert result['unique'] and result['changes'] == [] and result['tries'] == 1
+
+    # The uniqueness checks share one search budget
+    empty = [[0] * 9 for _ in range(9)]
+    result = correct_board(empty, confident_probs(empty), max_nodes=1)
+    assert not result['unique'] and result['board'] == empty
+    assert result['aborted']['reason'] == 'max_nodes'
@@ -0,0 +1,169 @@
+import sys
+import os
+import io
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import cv2
+import numpy as np
+import pytest
+from session_store import SessionStore, DiskSessionBackend, UploadTooLarge, PNG_SIGNATURE, decode_image, read_upload
+
+
+def make_image(value, size=32):
+    return np.full((size, size, 3), value, dtype=np.uint8)
+
+
+def test_roundtrip_and_lazy_png():
+    store = SessionStore()
+    sid = store.create()
+    store.put(sid, 'warped_board', make_image(7))
+    assert store.get(sid, 'warped_board')[0, 0, 0] == 7
+    assert store.get(sid, 'missing') is None
+    png = store.get_png(sid, 'warped_board')
+    assert np.array_equal(decode_image(png), make_image(7))
+    with pytest.raises(FileNotFoundError):
+        store.get('not-a-session', 'warped_board')
+
+
+def test_memory_budget_and_ttl_eviction():
+    image = make_image(1)
+    store = SessionStore(max_bytes=2 * image.nbytes)
+    first, second = store.create(), store.create()
+    store.put(first, 'img', image)
+    store.put(second, 'img', image)
+    store.get(first, 'img')  # first is now most recently used
+    third = store.create()
+    store.put(third, 'img', image)
+    with pytest.raises(FileNotFoundError):
+        store.get(second, 'img')
+    assert store.stats() == {'sessions': 2, 'bytes': 2 * image.nbytes}
+
+    store = SessionStore(ttl_seconds=0.01)
+    sid = store.create()
+    time.sleep(0.02)
+    store.create()
+    with pytest.raises(FileNotFoundError):
+        store.get(sid, 'img')
+
+
+def test_rebuildable_images_go_before_live_sessions():
+    image = make_image(1)
+    store = SessionStore(max_bytes=3 * image.nbytes, rebuildable=('warped_board',))
+    first, second = store.create(), store.create()
+    for sid in (first, second):
+        store.put(sid, 'uploaded_image', image)
+        store.put(sid, 'warped_board', image)
+    # Over budget: the older session loses its warped board, not its upload
+    assert store.get(first, 'warped_board') is None
+    assert store.get(first, 'uploaded_image') is not None
+    assert store.stats() == {'sessions': 2, 'bytes': 3 * image.nbytes}
+
+    # With nothing left to shed, the least recently used session still goes
+    third = store.create()
+    store.put(third, 'uploaded_image', image)
+    store.put(third, 'warped_board', image)
+    with pytest.raises(FileNotFoundError):
+        store.get(second, 'uploaded_image')
+    assert store.get(first, 'uploaded_image') is not None
+
+
+def test_disk_backend_reloads_evicted_images(tmp_path):
+    image = make_image(3)
+    store = SessionStore(max_bytes=image.nbytes, backend=DiskSessionBackend(str(tmp_path)))
+    sid = store.create()
+    store.put(sid, 'warped_board', image)
+    store.put(store.create(), 'warped_board', make_image(4))  # evicts the first session from memory
+    assert os.path.exists(tmp_path / sid[:2] / sid / 'warped_board.png')
+    assert np.array_equal(store.get(sid, 'warped_board'), image)
+    assert cv2.imdecode(np.frombuffer(store.get_png(sid, 'warped_board'), np.uint8), cv2.IMREAD_COLOR) is not None
+
+
+def test_disk_backend_stores_uploads_as_png(tmp_path):
+    image = make_image(9)
+    _, jpeg = cv2.imencode('.jpg', image)
+    store = SessionStore(max_bytes=0, backend=DiskSessionBackend(str(tmp_path)))
+    sid = store.create()
+    store.put(sid, 'uploaded_image', image, encoded=jpeg.tobytes())
+    store.put(store.create(), 'other', make_image(4))  # drops the first session from memory
+    png = store.get_png(sid, 'uploaded_image')
+    assert png.startswith(PNG_SIGNATURE)
+    assert np.array_equal(decode_image(png), image)
+
+    # Reloading an evicted session does not count it in memory
+    assert store.get(sid, 'uploaded_image') is not None
+    assert store.total_bytes == sum(session['bytes'] for session in store.sessions.values())
+
+
+def test_disk_sweep_expires_and_enforces_quota(tmp_path):
+    backend = DiskSessionBackend(str(tmp_path), ttl_seconds=60, max_bytes=10 ** 9)
+    store = SessionStore(backend=backend)
+    sessions = [store.create() for _ in range(4)]
+    for i, sid in enumerate(sessions):
+        store.put(sid, 'img', make_image(i), encoded=PNG_SIGNATURE + bytes(1000 - len(PNG_SIGNATURE)))
+        os.utime(tmp_path / sid[:2] / sid, (time.time() - 10 * (4 - i),) * 2)  # oldest first
+    os.utime(tmp_path / sessions[0][:2] / sessions[0], (time.time() - 120,) * 2)
+    os.makedirs(tmp_path / 'legacy-unsharded-session')
+    os.utime(tmp_path / 'legacy-unsharded-session', (time.time() - 120,) * 2)
+
+    assert backend.sweep() == {'sessions': 3, 'bytes': 3000, 'removed': 2}
+    assert not backend.exists(sessions[0])
+    assert not os.path.exists(tmp_path / 'legacy-unsharded-session')
+
+    backend.max_bytes = 1500  # keeps only the most recently used session
+    assert backend.sweep() == {'sessions': 1, 'bytes': 1000, 'removed': 2}
+    assert [backend.exists(sid) for sid in sessions] == [False, False, False, True]
+
+
+def test_busy_session_survives_the_sweep(tmp_path):
+    backend = DiskSessionBackend(str(tmp_path), ttl_seconds=0.5)
+    store = SessionStore(ttl_seconds=0.5, backend=backend)
+    sid = store.create()
+    store.put(sid, 'img', make_image(1))
+    deadline = time.time() + 1.0  # twice the TTL, used every 20 ms (well under ttl / 10)
+    while time.time() < deadline:
+        store.get_meta(sid, 'corners')
+        time.sleep(0.02)
+    assert backend.sweep()['removed'] == 0
+    assert backend.exists(sid)
+
+
+def test_sweeper_starts_with_the_first_session(tmp_path):
+    backend = DiskSessionBackend(str(tmp_path), ttl_seconds=0, sweep_interval=0.01)
+    assert backend._sweeper is None
+    sid = SessionStore(backend=backend).create()
+    try:
+        deadline = time.time() + 5
+        while backend.stats() is None and time.time() < deadline:
+            time.sleep(0.01)
+        assert backend.stats() is not None and not backend.exists(sid)
+    finally:
+        backend.stop_sweeper()
+    SessionStore(backend=backend).create()
+    assert backend._sweeper is None  # stays stopped once stopped explicitly
+
+    backend = DiskSessionBackend(str(tmp_path))  # no interval: sweeping is left to the caller
+    SessionStore(backend=backend).create()
+    assert backend._sweeper is None
+
+
+def test_read_upload_stops_at_the_limit():
+    data = bytes(range(256)) * 1000
+    assert bytes(read_upload(io.BytesIO(data), len(data), len(data))) == data
+    assert bytes(read_upload(io.BytesIO(data), len(data), chunk_size=1000)) == data  # length unknown
+
+    stream = io.BytesIO(data * 10)
+    with pytest.raises(UploadTooLarge):
+        read_upload(stream, len(data), chunk_size=1000)
+    assert stream.tell() <= len(data) + 1000
+    with pytest.raises(UploadTooLarge):
+        read_upload(io.BytesIO(data), 100, len(data))
+
+
+def test_disk_backend_rejects_paths_outside_the_session(tmp_path):
+    backend = DiskSessionBackend(str(tmp_path / 'sessions'))
+    store = SessionStore(backend=backend)
+    sid = store.create()
+    (tmp_path / 'secret.png').write_bytes(b'secret')
+    with pytest.raises(FileNotFoundError):
+        store.get_png(sid, '../../../secret')
@@ -0,0 +1,82 @@
+import sys
+import os
+import random
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from solver import parse_puzzle, unpack_step, is_board_valid
+from solve_cache import SolveCache, canonical_form, solve_with_cache, LINE_ORDERS
+
+puzzle_str = "520006000000000701300000000000400800600000050000000000041800000000030020008700000"
+
+
+def random_equivalent(board, rng):
+    """
+    Applies a random band/stack/row/column permutation, relabeling and transposition.
+    """
+    rows, cols = rng.choice(LINE_ORDERS), rng.choice(LINE_ORDERS)
+    labels = [0] + rng.sample(range(1, 10), 9)
+    out = [[labels[board[rows[r]][cols[c]]] for c in range(9)] for r in range(9)]
+    if rng.random() < 0.5:
+        out = [list(col) for col in zip(*out)]
+    return out
+
+
+def test_canonical_form_is_invariant():
+    rng = random.Random(1)
+    board = parse_puzzle(puzzle_str)
+    key, _ = canonical_form(board)
+    for _ in range(10):
+        assert canonical_form(random_equivalent(board, rng))[0] == key
+
+
+def test_cache_hit_maps_solution_and_steps_back():
+    rng = random.Random(2)
+    cache = SolveCache(max_entries=8)
+    board = parse_puzzle(puzzle_str)
+
+    for i in range(3):
+        puzzle = random_equivalent(board, rng)
+        success, steps, final_board = solve_with_cache([row[:] for row in puzzle], cache)
+        assert success
+        assert is_board_valid(final_board) and all(0 not in row for row in final_board)
+        assert all(puzzle[r][c] in (0, final_board[r][c]) for r in range(9) for c in range(9))
+
+        replay = [row[:] for row in puzzle]
+        for code in steps:
+            r, c, v = unpack_step(code)
+            replay[r][c] = v
+        assert replay == final_board
+
+    stats = cache.stats()
+    assert stats.pop('bytes') > 0
+    assert stats == {'entries': 1, 'hits': 2, 'misses': 1}
+
+
+def test_lru_eviction_and_sqlite_tier(tmp_path):
+    db_path = str(tmp_path / 'solutions.db')
+    cache = SolveCache(max_entries=1, db_path=db_path)
+    cache.put('a', '1' * 81, b'')
+    cache.put('b', '2' * 81, b'')
+    assert list(cache.entries) == ['b']
+
+    # A fresh cache on the same file still finds evicted and older entries
+    reopened = SolveCache(max_entries=1, db_path=db_path)
+    assert reopened.get('a') == ('1' * 81, b'')
+    assert reopened.get('missing') is None
+    assert reopened.stats() == {'entries': 1, 'bytes': 0, 'hits': 1, 'misses': 1}
+
+
+def test_cache_bounds_step_log_bytes(tmp_path):
+    cache = SolveCache(max_entries=10, db_path=str(tmp_path / 'solutions.db'), max_bytes=250, max_entry_bytes=200)
+    assert not cache.put('huge', '1' * 81, bytes(300))  # over the per-entry cap: not cached anywhere
+    assert cache.get('huge') is None
+    assert cache.put('a', '1' * 81, bytes(200)) and cache.put('b', '2' * 81, bytes(100))
+    assert list(cache.entries) == ['b'] and cache.stats()['bytes'] == 100
+
+    # Unsolvable puzzles are cached without their step log
+    unsolvable = parse_puzzle('123456780' + '000000009' + '0' * 63)  # (0, 8) can only be 9
+    success, _, _ = solve_with_cache(unsolvable, cache)
+    assert success is False
+    assert ('', b'') in cache.entries.values()
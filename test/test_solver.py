@@ -1,14 +1,26 @@
 import time
 import sys
 import os
+import random
 
 # Add the project root to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from solver import (
     solve_sudoku,
+    solve_and_record_steps,
+    iter_solve_steps,
+    count_solutions,
+    solve_puzzle,
+    parse_puzzle,
+    format_puzzle,
+    unpack_step,
+    encode_steps,
+    SolveAborted,
+    SearchBudget,
     print_board, 
-    is_board_valid
+    is_board_valid,
+    board_size
 )
 
 test_board = [
@@ -37,3 +49,222 @@ if is_board_valid(test_board):
         print("\nNo solution exists.")
 else:
     print("\nThe board is not valid.")
+
+
+# Hard 17-clue puzzle that takes the old naive backtracker minutes
+hard_board_str = "000000010400000000020000000000050407008000300001090000300400200050100000000806000"
+
+# Needs real guessing: propagation alone does not finish it
+search_board_str = "520006000000000701300000000000400800600000050000000000041800000000030020008700000"
+
+
+def parse_board(s):
+    return [[int(ch) for ch in s[r * 9:r * 9 + 9]] for r in range(9)]
+
+
+def is_complete_solution(board, puzzle):
+    size = len(puzzle)
+    full = list(range(1, size + 1))
+    if any(sorted(row) != full for row in board):
+        return False
+    if any(sorted(col) != full for col in zip(*board)):
+        return False
+    if not is_board_valid(board):
+        return False
+    # Givens must be kept
+    return all(puzzle[r][c] in (0, board[r][c]) for r in range(size) for c in range(size))
+
+
+def test_solve_sudoku_hard_puzzle():
+    puzzle = parse_board(hard_board_str)
+    board = [row[:] for row in puzzle]
+    assert solve_sudoku(board)
+    assert is_complete_solution(board, puzzle)
+
+
+def test_solve_and_record_steps_replays_to_final_board():
+    puzzle = parse_board(hard_board_str)
+    success, steps, final_board = solve_and_record_steps([row[:] for row in puzzle])
+    assert success
+    assert is_complete_solution(final_board, puzzle)
+
+    # Replaying placements and removals must land on the final board
+    replay = [row[:] for row in puzzle]
+    for step in steps:
+        replay[step['row']][step['col']] = step['value']
+    assert replay == final_board
+
+
+def test_rejects_invalid_and_unsolvable_boards():
+    invalid = parse_board(hard_board_str)
+    invalid[0][0] = 1  # duplicate 1 in the top row
+    assert not solve_sudoku(invalid)
+
+    # Valid givens, but the top-left cell has no candidate left
+    unsolvable = [[0] * 9 for _ in range(9)]
+    unsolvable[0][1:9] = [2, 3, 4, 5, 6, 7, 8, 9]
+    unsolvable[1][0] = 1
+    success, _, _ = solve_and_record_steps(unsolvable)
+    assert not success
+
+
+def test_dlx_solver_matches_backtracker():
+    puzzle = parse_board(hard_board_str)
+    success, steps, final_board = solve_and_record_steps([row[:] for row in puzzle], solver='dlx')
+    assert success
+    assert is_complete_solution(final_board, puzzle)
+
+    expected = [row[:] for row in puzzle]
+    assert solve_sudoku(expected)
+    assert final_board == expected  # 17-clue puzzles have a unique solution
+
+    replay = [row[:] for row in puzzle]
+    for step in steps:
+        replay[step['row']][step['col']] = step['value']
+    assert replay == final_board
+
+
+def test_dlx_reports_unsolvable():
+    unsolvable = [[0] * 9 for _ in range(9)]
+    unsolvable[0][1:9] = [2, 3, 4, 5, 6, 7, 8, 9]
+    unsolvable[1][0] = 1
+    assert not solve_sudoku(unsolvable, solver='dlx')
+    assert unsolvable[0][0] == 0
+
+
+def test_count_solutions_stops_at_limit():
+    puzzle = parse_board(hard_board_str)
+    assert count_solutions(puzzle) == 1
+
+    # Dropping clues from a 17-clue puzzle makes it ambiguous
+    ambiguous = [row[:] for row in puzzle]
+    ambiguous[0][7] = 0
+    ambiguous[1][0] = 0
+    assert count_solutions(ambiguous) == 2
+    assert count_solutions([[0] * 9 for _ in range(9)], limit=50) == 50
+
+    invalid = [row[:] for row in puzzle]
+    invalid[0][0] = 1
+    assert count_solutions(invalid) == 0
+    assert puzzle == parse_board(hard_board_str)  # board is not modified
+
+
+def test_solve_puzzle_strings_and_bad_input():
+    result = solve_puzzle(hard_board_str)
+    assert result['success']
+    assert is_complete_solution(parse_puzzle(result['solution']), parse_board(hard_board_str))
+    assert format_puzzle(parse_puzzle(hard_board_str.replace('0', '.'))) == hard_board_str
+
+    assert solve_puzzle(parse_board(hard_board_str), solver='dlx') == result
+    assert 'error' in solve_puzzle('123')
+    assert not solve_puzzle('11' + '0' * 79)['success']
+
+
+def test_compact_steps_match_dict_steps():
+    puzzle = parse_board(hard_board_str)
+    _, dict_steps, _ = solve_and_record_steps([row[:] for row in puzzle])
+    success, packed, final_board = solve_and_record_steps([row[:] for row in puzzle], compact=True)
+    assert success
+    assert [unpack_step(code) for code in packed] == [(s['row'], s['col'], s['value']) for s in dict_steps]
+    assert len(encode_steps(packed)) == 2 * len(packed)
+
+
+def test_iter_solve_steps_streams_same_steps():
+    puzzle = parse_board(hard_board_str)
+    _, packed, expected = solve_and_record_steps([row[:] for row in puzzle], compact=True)
+
+    board = [row[:] for row in puzzle]
+    stream = iter_solve_steps(board, batch_size=32)
+    streamed = []
+    try:
+        while True:
+            streamed.extend(next(stream))
+    except StopIteration as stop:
+        assert stop.value is True
+    assert streamed == list(packed)
+    assert board == expected
+
+    # Closing early abandons the search and leaves the board untouched
+    board = [row[:] for row in puzzle]
+    stream = iter_solve_steps(board, batch_size=1)
+    next(stream)
+    stream.close()
+    assert board == puzzle
+
+
+def test_search_budget_aborts_with_stats():
+    puzzle = parse_board(search_board_str)
+    board = [row[:] for row in puzzle]
+    result = solve_sudoku(board, max_nodes=3)
+    assert isinstance(result, SolveAborted) and not result
+    assert result.reason == 'max_nodes'
+    assert result.nodes == 4
+    assert board == puzzle
+
+    success, _, _ = solve_and_record_steps([row[:] for row in puzzle], solver='dlx', timeout=0)
+    assert isinstance(success, SolveAborted)
+    assert success.to_dict()['reason'] == 'timeout'
+
+    # A generous budget does not get in the way
+    assert solve_sudoku([row[:] for row in puzzle], timeout=10, max_nodes=100000) is True
+    assert solve_puzzle(search_board_str, max_nodes=1)['aborted']['reason'] == 'max_nodes'
+
+    # Counting takes the same budget, and a shared one is spent across calls
+    counted = count_solutions(puzzle, max_nodes=3)
+    assert isinstance(counted, SolveAborted) and counted.reason == 'max_nodes'
+    budget = SearchBudget(max_nodes=100000)
+    assert count_solutions(puzzle, budget=budget) == 1 and budget.nodes > 0
+
+
+def make_puzzle(size, blanks, seed):
+    """
+    Pattern solution with shuffled digits and rows within each band, with a share of
+    the cells blanked (so not necessarily uniquely solvable).
+    """
+    rng = random.Random(seed)
+    box = int(size ** 0.5)
+    digits = rng.sample(range(1, size + 1), size)
+    rows = [band * box + i for band in range(box) for i in rng.sample(range(box), box)]
+    board = [[digits[(box * (r % box) + r // box + c) % size] for c in range(size)] for r in rows]
+    for cell in rng.sample(range(size * size), int(blanks * size * size)):
+        board[cell // size][cell % size] = 0
+    return board
+
+
+def test_solves_other_board_sizes():
+    for size, blanks in ((4, 0.6), (16, 0.55), (25, 0.4)):
+        puzzle = make_puzzle(size, blanks, seed=size)
+        assert board_size(puzzle) == size and is_board_valid(puzzle)
+        for solver in ('backtrack', 'dlx'):
+            success, packed, final_board = solve_and_record_steps(
+                [row[:] for row in puzzle], solver=solver, compact=True
+            )
+            assert success
+            assert is_complete_solution(final_board, puzzle)
+
+            # Steps use 5 value bits above 9x9 and replay to the solution
+            replay = [row[:] for row in puzzle]
+            for code in packed:
+                r, c, v = unpack_step(code, size)
+                replay[r][c] = v
+            assert replay == final_board
+        assert count_solutions(final_board) == 1
+
+
+def test_board_shape_and_values_checks():
+    assert is_board_valid([[0] * 4 for _ in range(4)])
+    assert not is_board_valid([[0] * 6 for _ in range(6)])  # 6 is not a square
+    assert not is_board_valid([[0] * 9 for _ in range(8)])
+    assert not is_board_valid([[5, 0, 0, 0]] + [[0] * 4 for _ in range(3)])  # 5 does not fit a 4x4
+    for cell in ('1', None, 1.0, True):
+        assert not is_board_valid([[cell, 0, 0, 0]] + [[0] * 4 for _ in range(3)])
+    box_clash = [[0] * 16 for _ in range(16)]
+    box_clash[0][0] = box_clash[3][3] = 16
+    assert not is_board_valid(box_clash)
+    assert not solve_sudoku(box_clash, solver='dlx')
+    for bad in ([], [[0] * 36 for _ in range(36)]):
+        try:
+            board_size(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"{len(bad)}x{len(bad)} accepted")
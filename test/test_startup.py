@@ -0,0 +1,24 @@
+import sys
+import os
+import json
+import subprocess
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def test_solver_only_worker_does_not_load_vision():
+    # Fresh interpreter, so modules imported by other tests do not count
+    code = (
+        "import json, sys, app\n"
+        "app.create_app('off')\n"
+        "client = app.app.test_client()\n"
+        "solved = client.post('/solve', json={'grid': [[0] * 9 for _ in range(9)]}).status_code\n"
+        "ready = client.get('/ready')\n"
+        "print(json.dumps([solved, ready.status_code, ready.json['warmup']['state'],\n"
+        "                  'vision.OCR' in sys.modules, 'scipy' in sys.modules]))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    assert json.loads(output.strip().splitlines()[-1]) == [200, 200, 'idle', False, False]
@@ -1,20 +1,139 @@
+import os
+import threading
+import time
 import cv2
 import numpy as np
-import tensorflow as tf
 from skimage.segmentation import clear_border
 
-from vision.preprocessing import preprocess_for_model
+from metrics import timed, registry, BATCH_BUCKETS
+from vision.preprocessing import preprocess_for_model, center_digit, find_cell_bounds
 
 MODEL_PATH = 'models/mnist_model.h5'
+NUMPY_MODEL_PATH = 'models/mnist_model.npz'  # written by models/export_numpy_model.py
+INT8_MODEL_PATH = 'models/mnist_model_int8.tflite'  # written by models/quantize_model.py
+# 'keras', 'numpy', 'int8', or 'auto' (numpy when the exported model exists).
+# TensorFlow is only imported for 'keras' (and for 'int8' when no standalone TFLite interpreter is installed).
+OCR_BACKEND = os.environ.get('OCR_BACKEND', 'auto')
+# How recognize_board cuts cells: 'lines' (between detected grid lines) or 'uniform' (h//9 tiles)
+OCR_SEGMENTATION = os.environ.get('OCR_SEGMENTATION', 'uniform')
+# Cell batches of concurrent requests are merged into one forward pass (see vision/inference.py),
+# dispatched when OCR_MAX_BATCH rows are queued or OCR_BATCH_WINDOW_MS has passed. The default window
+# of 0 merges whatever queued up during the previous pass, so a lone request is never delayed.
+# OCR_MICROBATCH=0 disables it.
+OCR_MICROBATCH = os.environ.get('OCR_MICROBATCH', '1') == '1'
+OCR_MAX_BATCH = int(os.environ.get('OCR_MAX_BATCH', 256))
+OCR_BATCH_WINDOW_MS = float(os.environ.get('OCR_BATCH_WINDOW_MS', 0))
 _model = None  # lazy-loaded model
+_infer = None  # traced forward pass, built on first use
+_numpy_model = None  # lazy-loaded NumPy runtime model
+_int8_model = None  # lazy-loaded quantized TFLite model
+_batcher = None  # micro-batching worker, started on first use
+_load_lock = threading.RLock()  # so concurrent first requests load each model only once
 
 def get_model():
     global _model
     if _model is None:
-        _model = tf.keras.models.load_model(MODEL_PATH)
+        with _load_lock:
+            if _model is None:
+                import tensorflow as tf
+                _model = tf.keras.models.load_model(MODEL_PATH)
     return _model
 
 
+def get_numpy_model():
+    global _numpy_model
+    if _numpy_model is None:
+        with _load_lock:
+            if _numpy_model is None:
+                from vision.numpy_model import NumpyDigitModel
+                _numpy_model = NumpyDigitModel(NUMPY_MODEL_PATH)
+    return _numpy_model
+
+
+def get_int8_model():
+    global _int8_model
+    if _int8_model is None:
+        with _load_lock:
+            if _int8_model is None:
+                from vision.tflite_model import TFLiteDigitModel
+                _int8_model = TFLiteDigitModel(INT8_MODEL_PATH)
+    return _int8_model
+
+
+def get_backend():
+    if OCR_BACKEND == 'auto':
+        return 'numpy' if os.path.exists(NUMPY_MODEL_PATH) else 'keras'
+    return OCR_BACKEND
+
+
+def get_infer():
+    """
+    Returns a tf.function running the model in inference mode on a (N, 28, 28, 1) batch.
+    The unknown batch dimension in the signature means it is traced only once.
+    """
+    global _infer
+    if _infer is None:
+        with _load_lock:
+            if _infer is None:
+                import tensorflow as tf
+                model = get_model()
+                _infer = tf.function(
+                    lambda x: model(x, training=False),
+                    input_signature=[tf.TensorSpec(shape=(None, 28, 28, 1), dtype=tf.float32)]
+                )
+    return _infer
+
+
+@timed('inference')
+def forward(batch):
+    """
+    Runs one forward pass over a (N, 28, 28, 1) float32 batch on the configured backend.
+    """
+    backend = get_backend()
+    registry.observe('sudoku_ocr_batch_cells', len(batch), buckets=BATCH_BUCKETS, backend=backend)
+    if backend == 'numpy':
+        return get_numpy_model().predict(batch)
+    if backend == 'int8':
+        return get_int8_model().predict(batch)
+    return get_infer()(batch).numpy()
+
+
+def get_batcher():
+    global _batcher
+    if _batcher is None:
+        with _load_lock:
+            if _batcher is None:
+                from vision.inference import MicroBatcher
+                _batcher = MicroBatcher(forward, max_batch=OCR_MAX_BATCH, max_wait_ms=OCR_BATCH_WINDOW_MS)
+    return _batcher
+
+
+def predict_digits(batch):
+    """
+    Returns the class probabilities for a (N, 28, 28, 1) float32 batch, sharing the forward
+    pass with concurrent requests unless OCR_MICROBATCH is off.
+    """
+    if OCR_MICROBATCH:
+        return get_batcher().predict(batch)
+    return forward(batch)
+
+
+def batcher_stats():
+    return _batcher.stats() if _batcher is not None else None
+
+
+def warm_up():
+    """
+    Loads the model, builds the traced forward pass and starts the batcher ahead of the
+    first request. Returns the time taken in milliseconds.
+    """
+    start = time.perf_counter()
+    for size in (1, 81):  # also sizes the TFLite interpreter for a full board
+        predict_digits(np.zeros((size, 28, 28, 1), dtype=np.float32))
+    return (time.perf_counter() - start) * 1000
+
+
+@timed('is_blank')
 def is_blank(cell_img, area_thresh=0.02, margin=0):
     """
     Check if the cell is blank or has too little content.
@@ -52,25 +171,134 @@ def is_blank(cell_img, area_thresh=0.02, margin=0):
 
 
 
-def recognize_cells(cell_imgs):
+@timed('find_digit_cells')
+def find_digit_cells(warped_img, area_thresh=0.02, segmentation='uniform'):
+    """
+    Grid-level version of is_blank for all 81 cells at once.
+    Each cell tile gets its own Otsu threshold, as in is_blank, so uneven lighting across the
+    board does not matter; the connected components of the thresholded board are then labelled
+    in a single pass, and those touching their cell's border (grid lines, neighbours) are
+    dropped, like clear_border.
+    Cells are uniform h//9 x w//9 tiles (as in split_cells), or with segmentation='lines' the
+    spans between the grid lines found by find_cell_bounds.
+    Returns a 9x9 boolean array (True = digit), the cleaned binary board, whose cell tiles can go
+    straight to center_digit, and the (row_spans, col_spans) used to cut them.
+    """
+    gray = cv2.cvtColor(warped_img, cv2.COLOR_BGR2GRAY) if len(warped_img.shape) == 3 else warped_img
+    h, w = gray.shape
+    cell_h, cell_w = h // 9, w // 9
+    if segmentation == 'uniform':
+        gray = gray[:cell_h * 9, :cell_w * 9]
+    elif segmentation != 'lines':
+        raise ValueError(f"Unknown segmentation: {segmentation}")
+
+    if segmentation == 'lines':
+        row_spans, col_spans = find_cell_bounds(gray)
+    else:
+        row_spans = [(i * cell_h, (i + 1) * cell_h) for i in range(9)]
+        col_spans = [(j * cell_w, (j + 1) * cell_w) for j in range(9)]
+
+    # Pixels between the cell spans (grid lines in 'lines' mode) stay background
+    thresh = np.zeros_like(gray)
+    for r0, r1 in row_spans:
+        for c0, c1 in col_spans:
+            thresh[r0:r1, c0:c1] = cv2.threshold(
+                gray[r0:r1, c0:c1], 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU
+            )[1]
+    row_start, row_stop = np.array(row_spans).T
+    col_start, col_stop = np.array(col_spans).T
+
+    n, labels, stats, _ = cv2.connectedComponentsWithStats(thresh, connectivity=8)
+
+    x, y = stats[:, cv2.CC_STAT_LEFT], stats[:, cv2.CC_STAT_TOP]
+    bw, bh = stats[:, cv2.CC_STAT_WIDTH], stats[:, cv2.CC_STAT_HEIGHT]
+    area = stats[:, cv2.CC_STAT_AREA]
+    col = np.clip(np.searchsorted(col_start, x, side='right') - 1, 0, 8)
+    row = np.clip(np.searchsorted(row_start, y, side='right') - 1, 0, 8)
+
+    # Keep components strictly inside one cell (label 0 is the background)
+    inside = (
+        (x > col_start[col]) & (y > row_start[row]) &
+        (x + bw < col_stop[col]) & (y + bh < row_stop[row])
+    )
+    inside[0] = False
+
+    largest = np.zeros(81, dtype=np.int64)
+    np.maximum.at(largest, (row * 9 + col)[inside], area[inside])
+    cell_area = np.outer(row_stop - row_start, col_stop - col_start).ravel()
+    has_digit = (largest >= area_thresh * cell_area).reshape(9, 9)
+
+    cleaned = np.where(inside[labels], 255, 0).astype(np.uint8)
+    return has_digit, cleaned, (row_spans, col_spans)
+
+
+def recognize_board(warped_img, segmentation=None, return_probs=False):
+    """
+    Recognize the digits of a warped board, using find_digit_cells for blank detection
+    and cleanup. segmentation defaults to OCR_SEGMENTATION. Blank detection matches
+    is_blank, but the model inputs are not those of recognize_cells(split_cells(...)):
+    instead of preprocess_for_model's margin crop, components touching the cell border
+    are removed, so the centered digits (and rarely the predictions) can differ.
+    With return_probs=True, returns (board, probs) where probs is the (9, 9, 10) array of
+    class probabilities (all zero for blank cells), as used by ocr_correction.py.
+    Unlike recognize_cells, model errors are raised rather than printed.
+    """
+    has_digit, cleaned, (row_spans, col_spans) = find_digit_cells(
+        warped_img, segmentation=segmentation or OCR_SEGMENTATION
+    )
+
+    board = [[0] * 9 for _ in range(9)]
+    probs = np.zeros((9, 9, 10), dtype=np.float32)
+    positions = [(r, c) for r in range(9) for c in range(9) if has_digit[r, c]]
+    if not positions:
+        return (board, probs) if return_probs else board
+
+    tensors = [
+        center_digit(cleaned[row_spans[r][0]:row_spans[r][1], col_spans[c][0]:col_spans[c][1]])
+        for r, c in positions
+    ]
+    # Inference errors propagate: an all-blank board from a failed prediction would
+    # otherwise look like a real reading and end up in the image cache
+    predictions = predict_digits(np.concatenate(tensors, axis=0))
+
+    for (row_idx, col_idx), prediction in zip(positions, predictions):
+        board[row_idx][col_idx] = int(np.argmax(prediction))
+        probs[row_idx, col_idx] = prediction
+    return (board, probs) if return_probs else board
+
+
+def recognize_cells(cell_imgs, return_probs=False):
     """
     Recognize digits in the given cell images using a pre-trained model.
     Each cell image is expected to be a 28x28 grayscale image.
-    Returns a 2D list of recognized digits.
+    All non-blank cells are preprocessed first and classified in a single batch.
+    Returns a 2D list of recognized digits, and with return_probs=True also the
+    (rows, cols, 10) class probabilities (all zero for blank cells).
     """
-    board = []
+    board = [[0] * len(row) for row in cell_imgs]
+    probs = np.zeros((len(cell_imgs), max(map(len, cell_imgs), default=0), 10), dtype=np.float32)
+    positions = []
+    tensors = []
     for row_idx, row in enumerate(cell_imgs):
-        board_row = []
         for col_idx, cell in enumerate(row):
-            digit = 0
             try:
                 if not is_blank(cell):
                     # Need to preprocess the image to match the model input
-                    input_tensor = preprocess_for_model(cell)
-                    prediction = get_model().predict(input_tensor, verbose=0)
-                    digit = int(np.argmax(prediction))
+                    tensors.append(preprocess_for_model(cell))
+                    positions.append((row_idx, col_idx))
             except Exception as e:
                 print(f"Error processing cell[{row_idx}][{col_idx}]: {e}")
-            board_row.append(digit)
-        board.append(board_row)
-    return board
+
+    if not tensors:
+        return (board, probs) if return_probs else board
+
+    try:
+        predictions = predict_digits(np.concatenate(tensors, axis=0))
+    except Exception as e:
+        print(f"Error running batched prediction for {len(tensors)} cells: {e}")
+        return (board, probs) if return_probs else board
+
+    for (row_idx, col_idx), prediction in zip(positions, predictions):
+        board[row_idx][col_idx] = int(np.argmax(prediction))
+        probs[row_idx, col_idx] = prediction
+    return (board, probs) if return_probs else board
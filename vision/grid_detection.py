@@ -1,6 +1,13 @@
+import time
 import cv2
 import numpy as np
 
+from metrics import timed
+from vision.preprocessing import preprocess_image
+
+DETECT_MAX_SIDE = 1000  # detection runs on a copy whose longest side is about this many pixels
+
+@timed('find_sudoku_contour')
 def find_sudoku_contour(thresh_img, min_area=1000, aspect_ratio_tol=0.05):
     """
     Find the best candidate contour for the Sudoku board.
@@ -34,6 +41,81 @@ def find_sudoku_contour(thresh_img, min_area=1000, aspect_ratio_tol=0.05):
     return best_candidate
 
 
+def detection_factor(shape, max_side=DETECT_MAX_SIDE):
+    """
+    Integer downscale factor that brings the longest side of an image of this shape close to max_side.
+    """
+    return max(1, int(round(max(shape[:2]) / float(max_side)))) if max_side else 1
+
+
+def downscale_for_detection(image, max_side=DETECT_MAX_SIDE):
+    """
+    Shrink the image by an integer factor so its longest side is roughly max_side (never upscales).
+    Integer factors keep INTER_AREA on its fast path; the few leftover edge pixels are dropped.
+    Returns the (possibly unchanged) image and the scale factor applied.
+    """
+    h, w = image.shape[:2]
+    factor = detection_factor(image.shape, max_side)
+    if factor == 1:
+        return image, 1.0
+    cropped = image[:h - h % factor, :w - w % factor]
+    small = cv2.resize(cropped, (w // factor, h // factor), interpolation=cv2.INTER_AREA)
+    return small, 1.0 / factor
+
+
+def refine_corners(image, corners, win):
+    """
+    Refine corner positions with cornerSubPix on small full-resolution patches around each corner,
+    so the full image never has to be converted to grayscale.
+    A corner that moves further than the search window is kept unrefined.
+    """
+    h, w = image.shape[:2]
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.01)
+    pad = 2 * win + 2
+    refined = corners.copy()
+    for i, (x, y) in enumerate(corners):
+        x0, y0 = max(0, int(x) - pad), max(0, int(y) - pad)
+        x1, y1 = min(w, int(x) + pad + 1), min(h, int(y) + pad + 1)
+        patch = image[y0:y1, x0:x1]
+        if patch.ndim == 3:
+            patch = cv2.cvtColor(patch, cv2.COLOR_BGR2GRAY)
+        if min(patch.shape) <= 2 * win + 5:
+            continue  # corner too close to the image edge
+        point = np.array([[[x - x0, y - y0]]], dtype="float32")
+        cv2.cornerSubPix(patch, point, (win, win), (-1, -1), criteria)
+        candidate = point[0, 0] + (x0, y0)
+        if np.all(np.abs(candidate - (x, y)) <= win):
+            refined[i] = candidate
+    return refined
+
+
+def find_grid_corners(image, max_side=DETECT_MAX_SIDE, refine=True, thresh=None):
+    """
+    Find the board corners of a full-resolution image by running preprocessing and contour
+    detection on a copy downscaled to max_side, then mapping the corners back (and optionally
+    refining them at full resolution). The warp should still sample the original image.
+    A threshold image from an earlier call with the same max_side can be passed to skip preprocessing.
+    Returns (corners as a 4x2 float32 array in original pixels, thresh, timings in ms).
+    """
+    timings = {}
+    start = time.perf_counter()
+    if thresh is None or thresh.shape[1] != image.shape[1] // detection_factor(image.shape, max_side):
+        small, scale = downscale_for_detection(image, max_side)
+        _, thresh = preprocess_image(small)
+    else:
+        scale = 1.0 / detection_factor(image.shape, max_side)
+    timings['preprocess'] = round((time.perf_counter() - start) * 1000, 2)
+
+    start = time.perf_counter()
+    contour = find_sudoku_contour(thresh)
+    corners = contour.reshape(4, 2).astype("float32") / scale
+    if refine and scale < 1.0:
+        corners = refine_corners(image, corners, win=max(2, int(np.ceil(1.0 / scale))))
+    timings['detect'] = round((time.perf_counter() - start) * 1000, 2)
+    return corners, thresh, timings
+
+
+@timed('get_perspective_transform')
 def get_perspective_transform(image, contour):
     """
     Compute a top-down warped image of the Sudoku board from a 4-point contour.
@@ -65,6 +147,7 @@ def get_perspective_transform(image, contour):
 
     return warped, rect  # return both warped image and ordered points
 
+@timed('warp_from_corners')
 def warp_from_corners(image, corners):
     """
     Warp the original image using manually provided corners (TL, TR, BR, BL).
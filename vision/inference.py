@@ -0,0 +1,72 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Merges the cell batches of concurrent requests into one forward pass.
+    A single worker thread owns the model: it takes the first queued request, then
+    keeps collecting until max_batch rows are queued or max_wait_ms has passed
+    (with max_wait_ms=0 it only takes what queued up while the previous batch ran),
+    runs predict_fn once on the concatenation and hands each caller its own slice.
+    """
+
+    def __init__(self, predict_fn, max_batch=256, max_wait_ms=0.0):
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.requests = queue.Queue()
+        self.batches = 0
+        self.rows = 0
+        self.worker = threading.Thread(target=self._run, name='ocr-microbatcher', daemon=True)
+        self.worker.start()
+
+    def predict(self, x, timeout=None):
+        """
+        Blocking call with the same contract as predict_fn: (N, ...) in, (N, ...) out.
+        """
+        future = Future()
+        self.requests.put((np.asarray(x, dtype=np.float32), future))
+        return future.result(timeout)
+
+    def _collect(self):
+        pending = [self.requests.get()]
+        rows = len(pending[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while rows < self.max_batch:
+            try:
+                remaining = deadline - time.monotonic()
+                item = self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait()
+            except queue.Empty:
+                break
+            pending.append(item)
+            rows += len(item[0])
+        return pending
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            try:
+                batch = np.concatenate([x for x, _ in pending], axis=0)
+                output = self.predict_fn(batch)
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.rows += len(batch)
+            start = 0
+            for x, future in pending:
+                future.set_result(output[start:start + len(x)])
+                start += len(x)
+
+    def stats(self):
+        return {
+            'batches': self.batches, 'rows': self.rows, 'queued': self.requests.qsize(),
+            'meanBatch': round(self.rows / self.batches, 2) if self.batches else 0.0
+        }
@@ -0,0 +1,69 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Pure NumPy forward pass for the digit CNN, loaded from the .npz written by
+# models/export_numpy_model.py. Ops are stored in order under 'layers':
+#   conv    - 'same' padded, stride 1 convolution (im2col + matmul), then activation
+#   affine  - per-channel scale/shift (a BatchNorm the exporter could not fold)
+#   pool    - 2x2 max pooling, stride 2
+#   flatten - channels-last flatten, same order as Keras
+#   dense   - matmul + bias, then activation
+
+
+def conv2d_same(x, w, b):
+    """
+    Stride 1 'same' convolution of an (N, H, W, C) batch with a (kh, kw, C, K) kernel.
+    """
+    n, h, wd, c = x.shape
+    kh, kw, _, k = w.shape
+    xp = np.pad(x, ((0, 0), (kh // 2, (kh - 1) // 2), (kw // 2, (kw - 1) // 2), (0, 0)))
+    # (N, H, W, C, kh, kw) view -> rows of kh*kw*C patch values in kernel order
+    cols = sliding_window_view(xp, (kh, kw), axis=(1, 2))
+    cols = cols.transpose(0, 1, 2, 4, 5, 3).reshape(n * h * wd, kh * kw * c)
+    return (cols @ w.reshape(kh * kw * c, k) + b).reshape(n, h, wd, k)
+
+
+def max_pool_2x2(x):
+    n, h, w, c = x.shape
+    x = x[:, :h // 2 * 2, :w // 2 * 2]
+    return x.reshape(n, h // 2, 2, w // 2, 2, c).max(axis=(2, 4))
+
+
+def activate(x, activation):
+    if activation == 'relu':
+        return np.maximum(x, 0, out=x)
+    if activation == 'softmax':
+        e = np.exp(x - x.max(axis=-1, keepdims=True))
+        return e / e.sum(axis=-1, keepdims=True)
+    return x
+
+
+class NumpyDigitModel:
+    """
+    TensorFlow-free inference for the exported digit model.
+    predict() takes a (N, 28, 28, 1) float32 batch and returns (N, 10) probabilities.
+    """
+
+    def __init__(self, path):
+        with np.load(path) as data:
+            self.layers = [str(name) for name in data['layers']]
+            self.activations = [str(name) for name in data['activations']]
+            self.params = {key: data[key].astype(np.float32) for key in data.files
+                           if key not in ('layers', 'activations')}
+
+    def predict(self, x):
+        x = np.asarray(x, dtype=np.float32)
+        for i, (layer, activation) in enumerate(zip(self.layers, self.activations)):
+            if layer == 'conv':
+                x = activate(conv2d_same(x, self.params[f'{i}_w'], self.params[f'{i}_b']), activation)
+            elif layer == 'affine':
+                x = x * self.params[f'{i}_w'] + self.params[f'{i}_b']
+            elif layer == 'pool':
+                x = max_pool_2x2(x)
+            elif layer == 'flatten':
+                x = x.reshape(x.shape[0], -1)
+            elif layer == 'dense':
+                x = activate(x @ self.params[f'{i}_w'] + self.params[f'{i}_b'], activation)
+            else:
+                raise ValueError(f"Unknown layer type in exported model: {layer}")
+        return x
@@ -4,13 +4,17 @@ from PIL import Image
 from scipy import ndimage
 from skimage.segmentation import clear_border
 
+from metrics import timed
+
+@timed('preprocess_image')
 def preprocess_image(path):
     """
     Preprocess the image for grid detection.
     This includes reading the image, converting to grayscale,
     applying Gaussian blur, and adaptive thresholding.
+    `path` may also be an already decoded BGR image.
     """
-    image = cv2.imread(path)
+    image = path if isinstance(path, np.ndarray) else cv2.imread(path)
     gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     blur = cv2.GaussianBlur(gray, (7, 7), 3) # Apply Gaussian blur to reduce noise (can be adjusted)
     # Apply adaptive thresholding to create a binary image, inverts for better contour detection
@@ -43,6 +47,15 @@ def preprocess_for_model(cell_img, debug_path=None, margin=0.08):
     # Clear connected borders
     thresh_cleared = clear_border(thresh)
 
+    return center_digit(thresh_cleared, debug_path)
+
+def center_digit(thresh_cleared, debug_path=None):
+    """
+    Turn a cleaned binary cell (white digit on black, border noise removed) into model input.
+    The digit is cropped to its bounding box, scaled to fit 20x20, and centered by
+    center of mass on a 28x28 canvas, MNIST style.
+    Returns an array of shape (1, 28, 28, 1).
+    """
     coords = cv2.findNonZero(thresh_cleared)
     if coords is None:
         return np.zeros((1, 28, 28, 1), dtype=np.float32)
@@ -75,20 +88,79 @@ def preprocess_for_model(cell_img, debug_path=None, margin=0.08):
 
     return img_array
 
-def split_cells(warped_img):
+def _line_bands(profile, length, search=0.25, min_coverage=0.3):
+    """
+    Locate the 10 grid lines along one axis from a projection profile (line pixels per row or column).
+    Each line is searched near its uniform position; the band where the profile stays above half
+    its peak is taken as the line. Missing lines fall back to the uniform position with zero width.
+    Returns the 9 (start, stop) cell spans between consecutive lines.
+    """
+    cell = length / 9.0
+    radius = int(cell * search)
+    bands = []
+    for i in range(10):
+        expected = min(int(round(i * cell)), len(profile) - 1)
+        lo, hi = max(0, expected - radius), min(len(profile), expected + radius + 1)
+        peak = lo + int(np.argmax(profile[lo:hi]))
+        if profile[peak] < min_coverage * length:
+            bands.append((expected, expected))
+            continue
+        start, stop = peak, peak + 1
+        while start > lo and profile[start - 1] * 2 >= profile[peak]:
+            start -= 1
+        while stop < hi and profile[stop] * 2 >= profile[peak]:
+            stop += 1
+        bands.append((start, stop))
+
+    spans = [(bands[i][1], bands[i + 1][0]) for i in range(9)]
+    if any(stop - start < cell / 2 for start, stop in spans):
+        # Implausible detection, use the uniform layout for this axis
+        spans = [(int(round(i * cell)), int(round((i + 1) * cell))) for i in range(9)]
+    return spans
+
+def find_cell_bounds(warped_img, binary=None):
+    """
+    Find the grid lines of a warped board with a morphological line extraction and projection profiles.
+    `binary` can pass in an already computed inverted Otsu threshold of the board.
+    Returns (row_spans, col_spans): 9 (start, stop) pixel ranges each, covering the cell interiors
+    between the lines, so cells cut with them contain no grid line pixels.
+    """
+    if binary is None:
+        gray = cv2.cvtColor(warped_img, cv2.COLOR_BGR2GRAY) if len(warped_img.shape) == 3 else warped_img
+        binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)[1]
+    h, w = binary.shape
+
+    # Eroding with a long thin kernel keeps only runs longer than a cell and a half, i.e. grid lines.
+    # Only the profiles are needed, so the dilation half of a full opening is skipped
+    horizontal = cv2.erode(binary, cv2.getStructuringElement(cv2.MORPH_RECT, (max(1, w // 6), 1)))
+    vertical = cv2.erode(binary, cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(1, h // 6))))
+
+    row_profile = cv2.reduce(horizontal, 1, cv2.REDUCE_SUM, dtype=cv2.CV_32S).ravel() // 255
+    col_profile = cv2.reduce(vertical, 0, cv2.REDUCE_SUM, dtype=cv2.CV_32S).ravel() // 255
+    return _line_bands(row_profile, h), _line_bands(col_profile, w)
+
+@timed('split_cells')
+def split_cells(warped_img, mode='uniform'):
     """
     Split the warped image into 9x9 cells.
-    Each cell is expected to be a square of equal size.
+    mode='uniform' assumes equal cell size and spacing. mode='lines' cuts the cells between the
+    grid lines found by find_cell_bounds, which handles thick exterior and thin interior borders.
+    Cells are numpy views into warped_img, nothing is copied.
     """
+    if mode == 'lines':
+        row_spans, col_spans = find_cell_bounds(warped_img)
+        return [[warped_img[r0:r1, c0:c1] for c0, c1 in col_spans] for r0, r1 in row_spans]
+    if mode != 'uniform':
+        raise ValueError(f"Unknown split mode: {mode}")
+
     grid = []
     h, w = warped_img.shape[:2]
     cell_h = h // 9
     cell_w = w // 9
 
-    # Splits into 9 rows and 9 columns, could be improved with more advanced techniques
-    # like Hough Transform or contour detection for more complex grids
-    # Common problem is variable width of borders (exterior = thick, interior = thin)
-    # This is a simple approach that assumes uniform cell size and spacing
+    # Splits into 9 rows and 9 columns assuming uniform cell size and spacing.
+    # Common problem is variable width of borders (exterior = thick, interior = thin),
+    # which mode='lines' handles by locating the grid lines first
     for i in range(9):
         row = []
         for j in range(9):
@@ -97,4 +169,4 @@ def split_cells(warped_img):
             cell = warped_img[y_start:y_start + cell_h, x_start:x_start + cell_w]
             row.append(cell)
         grid.append(row)
-    return grid
\ No newline at end of file
+    return grid
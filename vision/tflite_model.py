@@ -0,0 +1,42 @@
+import threading
+
+import numpy as np
+
+# Prefer the standalone LiteRT / tflite-runtime interpreters, which avoid
+# importing all of TensorFlow; fall back to tf.lite when only TF is installed.
+try:
+    from ai_edge_litert.interpreter import Interpreter
+except ImportError:
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        Interpreter = None
+
+
+class TFLiteDigitModel:
+    """
+    Runs the int8 model written by models/quantize_model.py.
+    predict() takes a (N, 28, 28, 1) float32 batch and returns (N, 10) probabilities.
+    """
+
+    def __init__(self, path):
+        interpreter_cls = Interpreter
+        if interpreter_cls is None:
+            import tensorflow as tf
+            interpreter_cls = tf.lite.Interpreter
+        self.interpreter = interpreter_cls(model_path=path)
+        self.input_index = self.interpreter.get_input_details()[0]['index']
+        self.output_index = self.interpreter.get_output_details()[0]['index']
+        self.batch_size = None
+        self.lock = threading.Lock()  # an interpreter is not safe to share between threads
+
+    def predict(self, x):
+        x = np.asarray(x, dtype=np.float32)
+        with self.lock:
+            if x.shape[0] != self.batch_size:
+                self.interpreter.resize_tensor_input(self.input_index, x.shape)
+                self.interpreter.allocate_tensors()
+                self.batch_size = x.shape[0]
+            self.interpreter.set_tensor(self.input_index, x)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self.output_index).copy()